@@ -5,30 +5,81 @@ sys.path.insert(0, str(Path(__file__).parent / "src"))
 import uvicorn
 import logging
 import asyncio
+import os
+import shutil
+import atexit
+import tempfile
 
 from src.common.setting import get_settings
-from src.common.logging import setup_logging
-from src.db.database import get_database
+from src.common.logging import setup_logging, start_log_server
 
 logger = logging.getLogger(__name__)
 setting = get_settings()
 
+def prepare_metrics_dir(workers: int):
+    # Phải set trước khi import prometheus_client; xoá file của lần chạy trước
+    if not setting.METRICS_MULTIPROC_DIR:
+        if workers <= 1:
+            return
+        # Nhiều worker mà không cấu hình dir: mỗi worker giữ registry riêng, /metrics
+        # chỉ trả số của worker nhận request -> tạo dir tạm, xoá khi process cha thoát
+        metrics_dir = Path(tempfile.mkdtemp(prefix=f"{setting.SERVICE_NAME}-metrics-"))
+        atexit.register(shutil.rmtree, metrics_dir, ignore_errors=True)
+        logger.info("METRICS_MULTIPROC_DIR not set, using %s", metrics_dir)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(metrics_dir)
+        return
+    metrics_dir = Path(setting.METRICS_MULTIPROC_DIR)
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    for db_file in metrics_dir.glob("*.db"):
+        db_file.unlink()
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(metrics_dir)
+
+def worker_count() -> int:
+    # Reload chỉ chạy được với 1 process
+    if setting.DEBUG_MODE:
+        return 1
+    return setting.WORKERS or os.cpu_count() or 1
+
 def pre_check():
-    # check db connection
-    get_database()
-    logger.info("✅ Database connection success")
+    # Chạy 1 lần ở process cha, không phải mỗi worker/reload. Import ở đây: db kéo theo
+    # prometheus_client, phải sau prepare_metrics_dir. Dùng cùng tên module với app
+    # (db.*) để không đăng ký event/metrics 2 lần
+    if not setting.DB_MIGRATE_ON_START:
+        # Migration là 1 bước deploy riêng: `python manage.py migrate`
+        return
+    from db.migrate import prepare_schema
+
+    prepare_schema()
+    logger.info("✅ Database schema ready")
 
 if __name__ == "__main__":
-    setup_logging(log_level="INFO", 
-                  log_dir=f"./log/{setting.SERVICE_NAME}", 
-                  log_file=f"{setting.SERVICE_NAME}.log")
+    log_dir = setting.LOG_DIR or f"./log/{setting.SERVICE_NAME}"
+    log_file = setting.LOG_FILE or f"{setting.SERVICE_NAME}.log"
+    setup_logging(log_level="INFO", log_dir=log_dir, log_file=log_file)
     
+    workers = worker_count()
+    if workers > 1 or setting.DEBUG_MODE:
+        # Worker (và process reload) được spawn: gửi log về đây qua socket, chỉ process này
+        # ghi / rotate file log -> không có file theo pid sinh thêm mỗi lần recycle worker
+        log_socket = start_log_server()
+        if log_socket:
+            os.environ["LOG_SOCKET"] = log_socket
+    prepare_metrics_dir(workers)
     pre_check()
     
+    # Worker được spawn (process mới), đọc settings từ env: engine / Redis / hash pool
+    # tạo trong lifespan của từng worker, không kế thừa gì từ process này
+    os.environ["WORKERS"] = str(workers)
+    logger.info("Starting %s worker(s)", workers)
+
     uvicorn.run('src.app:app', 
                 host=setting.HOST, 
                 port=setting.PORT,
                 reload=setting.DEBUG_MODE,
+                workers=workers,
+                # Supervisor khởi động lại worker đã thoát (recycle / crash), SIGHUP = restart lần lượt
+                limit_max_requests=(setting.WORKER_MAX_REQUESTS or None) if workers > 1 else None,
+                timeout_graceful_shutdown=setting.WORKER_GRACEFUL_TIMEOUT_SEC,
                 log_config=None,
                 log_level="info"
                 )
\ No newline at end of file
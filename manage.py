@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import argparse
+
+from common.logging import setup_logging
+from cli import calibrate_argon2, migrate, maintenance, import_users, bench_responses
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Auth service management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    calibrate_argon2.add_parser(subparsers)
+    migrate.add_parser(subparsers)
+    maintenance.add_parser(subparsers)
+    import_users.add_parser(subparsers)
+    bench_responses.add_parser(subparsers)
+    return parser
+
+
+if __name__ == "__main__":
+    setup_logging(log_level="INFO", log_dir=None, log_file=None)
+    args = build_parser().parse_args()
+    sys.exit(args.func(args))
@@ -0,0 +1,49 @@
+import time
+from typing import Any
+from fastapi import Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from common.context import add_server_timing
+from common.setting import get_settings
+
+setting = get_settings()
+
+
+class TimedJSONResponse(JSONResponse):
+    """
+    JSONResponse that reports its encoding time as Server-Timing `serialize`
+    """
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = super().render(content)
+        add_server_timing("serialize", time.perf_counter() - start)
+        return body
+
+
+class ModelJSONResponse(Response):
+    """
+    Serialize a Pydantic model straight to JSON bytes with its Rust serializer.
+    Same bytes as FastAPI's response_model path + JSONResponse (compact
+    separators, UTF-8 not escaped), without the re-validation and jsonable_encoder.
+    """
+    media_type = "application/json"
+
+    def render(self, content: BaseModel) -> bytes:
+        start = time.perf_counter()
+        body = content.__pydantic_serializer__.to_json(content)
+        add_server_timing("serialize", time.perf_counter() - start)
+        return body
+
+
+def envelope_response(envelope: BaseModel, status_code: int = status.HTTP_200_OK):
+    """
+    Return an ApiResponse envelope from a route.
+
+    With FAST_RESPONSES the envelope is dumped directly (FastAPI skips
+    response_model validation for Response objects, the route's response_model
+    is then only used for the docs), otherwise FastAPI serializes it as usual.
+    `status_code` must match the one declared on the route.
+    """
+    if not setting.FAST_RESPONSES:
+        return envelope
+    return ModelJSONResponse(envelope, status_code=status_code)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query, Request, status
+import logging
+
+from api.deps import require_admin
+from api.responses import envelope_response
+from db.database import get_database
+from schemas import ApiResponse, UserImportResult
+from services.user_import_service import UserImportService, get_import_executor, iter_lines
+
+router = APIRouter(prefix='/admin')
+logger = logging.getLogger(__name__)
+
+
+@router.post("/users/import", response_model=ApiResponse[UserImportResult], status_code=status.HTTP_200_OK)
+async def import_users(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    admin: dict = Depends(require_admin)):
+    """
+    Stream the request body (CSV with header or NDJSON) into the users table
+    """
+    result = await UserImportService.import_users(
+        get_database().async_session, iter_lines(request.stream()), format, get_import_executor())
+
+    logger.info("Admin %s imported %s users", admin.get('user_id'), result.imported)
+    return envelope_response(ApiResponse[UserImportResult](success=True, data=result))
@@ -1,37 +1,57 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, status
 from sqlalchemy.orm import Session
 import logging
 from schemas import (ApiResponse, UserCreate, UserRead, 
                      LoginRequest, LoginResponse, 
-                     RegisterReponse, RefreshTokenResponse)
-from db.database import get_database
+                     RegisterReponse, RefreshTokenResponse,
+                     RefreshRequest, IntrospectRequest, IntrospectResponse)
+from db.database import get_db
+from api.responses import envelope_response
 from services import UserService, AuthService
 
 router = APIRouter(prefix='/auth')
 logger = logging.getLogger(__name__)
 
-db_conn = get_database()
-
 
 @router.post("/register", response_model=ApiResponse[RegisterReponse], status_code=status.HTTP_201_CREATED)
-async def register_user(user_in : UserCreate, db: Session = Depends(db_conn.get_db)):
+async def register_user(user_in : UserCreate, db: Session = Depends(get_db)):
     new_user = await UserService.register_user(db, user_in)
-    return ApiResponse[RegisterReponse](success=True, data=new_user)
+    return envelope_response(ApiResponse[RegisterReponse](success=True, data=new_user),
+                             status_code=status.HTTP_201_CREATED)
 
 
 @router.post("/refresh-confirm/{user_id}", response_model=ApiResponse[RefreshTokenResponse], status_code=status.HTTP_200_OK)
-async def refreshconfirm(user_id: str, db: Session = Depends(db_conn.get_db)):
+async def refreshconfirm(user_id: str, db: Session = Depends(get_db)):
     res = await AuthService.refresh_confirm(db, user_id)
-    return ApiResponse[RefreshTokenResponse](success=True, data=res)
+    return envelope_response(ApiResponse[RefreshTokenResponse](success=True, data=res))
 
 
 @router.get("/confirm/{user_id}", response_model=ApiResponse[UserRead], status_code=status.HTTP_200_OK)
-async def confirm_user(user_id: str, token: str, db: Session = Depends(db_conn.get_db)):
+async def confirm_user(user_id: str, token: str, db: Session = Depends(get_db)):
     new_user = await AuthService.confirm_user(db, user_id, token)
-    return ApiResponse[UserRead](success=True, data=new_user)
+    return envelope_response(ApiResponse[UserRead](success=True, data=new_user))
 
 
 @router.post("/login", response_model=ApiResponse[LoginResponse], status_code=status.HTTP_200_OK)
-async def register_user(user_in : LoginRequest, db: Session = Depends(db_conn.get_db)):
-    response = await AuthService.login(db, user_in)
-    return ApiResponse[LoginResponse](success=True, data=response)
+async def register_user(user_in : LoginRequest, request: Request, db: Session = Depends(get_db)):
+    client_ip = request.client.host if request.client else None
+    response = await AuthService.login(db, user_in, client_ip)
+    return envelope_response(ApiResponse[LoginResponse](success=True, data=response))
+
+
+@router.post("/refresh", response_model=ApiResponse[LoginResponse], status_code=status.HTTP_200_OK)
+async def refresh_token(body: RefreshRequest, db: Session = Depends(get_db)):
+    response = await AuthService.refresh(db, body.refresh_token)
+    return envelope_response(ApiResponse[LoginResponse](success=True, data=response))
+
+
+@router.post("/revoke", response_model=ApiResponse[None], status_code=status.HTTP_200_OK)
+async def revoke_token(body: RefreshRequest):
+    await AuthService.revoke(body.refresh_token)
+    return envelope_response(ApiResponse[None](success=True, message="Token revoked"))
+
+
+@router.post("/introspect", response_model=ApiResponse[IntrospectResponse], status_code=status.HTTP_200_OK)
+async def introspect_tokens(body: IntrospectRequest):
+    response = await AuthService.introspect(body.tokens)
+    return envelope_response(ApiResponse[IntrospectResponse](success=True, data=response))
@@ -1,20 +1,77 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional
 import logging
-from schemas import (ApiResponse, UserCreate, UserRead)
-from db.database import get_database
+from common.setting import get_settings
+from schemas import (ApiResponse, UserCreate, UserRead, UserStatus,
+                     UserBatchRequest, UserBatchResponse,
+                     UserListFilter, UserListResponse)
+from db.database import get_database, get_db, get_read_db
+from api.deps import get_current_user, require_admin
+from api.responses import envelope_response
 from services import UserService
 
 router = APIRouter(prefix='/user')
 logger = logging.getLogger(__name__)
+setting = get_settings()
+
+@router.get("", response_model=ApiResponse[UserListResponse], status_code=status.HTTP_200_OK)
+async def list_users(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=setting.USER_LIST_MAX_LIMIT),
+    status_filter: Optional[UserStatus] = Query(None, alias="status"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    last_login_from: Optional[datetime] = None,
+    last_login_to: Optional[datetime] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    admin: dict = Depends(require_admin),
+    db: Session = Depends(get_read_db)):
+    """
+    Keyset pagination on (created_at, id); format=ndjson streams every row instead
+    """
+    filters = UserListFilter(status=status_filter,
+                             created_from=created_from, created_to=created_to,
+                             last_login_from=last_login_from, last_login_to=last_login_to)
+    if format == "ndjson":
+        return StreamingResponse(UserService.stream_users_ndjson(get_database().read_session_factory(request), filters),
+                                 media_type="application/x-ndjson")
+
+    res = await UserService.list_users(db, filters, cursor, limit)
+    return envelope_response(ApiResponse[UserListResponse](success=True, data=res))
+
+
+# /batch phải khai báo trước /{user_id}
+@router.get("/batch", response_model=ApiResponse[UserBatchResponse], status_code=status.HTTP_200_OK)
+async def get_users_batch(
+    ids: List[str] = Query(..., description="Repeated (?ids=a&ids=b) or comma separated"),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_read_db)):
+
+    user_ids = [i for value in ids for i in value.split(",") if i]
+    res = await UserService.get_users_by_ids(db, user_ids)
+    return envelope_response(ApiResponse[UserBatchResponse](success=True, data=res))
+
+
+@router.post("/batch", response_model=ApiResponse[UserBatchResponse], status_code=status.HTTP_200_OK)
+async def post_users_batch(
+    body: UserBatchRequest,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_read_db)):
+
+    res = await UserService.get_users_by_ids(db, body.ids)
+    return envelope_response(ApiResponse[UserBatchResponse](success=True, data=res))
 
-db_conn = get_database()
 
 @router.get("/{user_id}", response_model=ApiResponse[UserRead], status_code=status.HTTP_200_OK)
 async def get_user(
     user_id: str,
-    db: Session = Depends(db_conn.get_db)):
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_read_db)):
     
     user = await UserService.get_user_by_id(db, user_id)
-    return ApiResponse[UserRead](success=True, data=user)
+    return envelope_response(ApiResponse[UserRead](success=True, data=user))
 
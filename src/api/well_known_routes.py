@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Request, Response, status
+
+from common.setting import get_settings
+from utils.jwt_keys import get_key_store, is_asymmetric
+
+router = APIRouter(prefix='/.well-known')
+setting = get_settings()
+
+
+@router.get("/jwks.json")
+async def jwks(request: Request):
+    """
+    Public keys for verifying our tokens locally (empty with HS256)
+    """
+    if not is_asymmetric(setting.JWT_ALGORITHM):
+        return Response(content=b'{"keys":[]}', media_type="application/json")
+
+    body, etag = get_key_store().jwks()
+    headers = {
+        "Cache-Control": f"public, max-age={setting.JWKS_MAX_AGE_SEC}",
+        "ETag": f'"{etag}"',
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,20 +1,126 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from common.setting import get_settings
 from api.v1 import api_v1_router
-from middlewares.request_id import RequestIDMiddleware
+from api import well_known_routes
+from api.responses import TimedJSONResponse
+from middlewares.request_context import RequestContextMiddleware
+from middlewares.read_your_writes import ReadYourWritesMiddleware
+from middlewares.metrics import MetricsMiddleware
+from common.metrics import render_metrics
+from utils.hash_utils import shutdown_hash_pool
+from utils.jwt_keys import get_key_store, is_asymmetric
+from utils.jwt_utils import get_token_cache
+from db.database import get_database
+from db.redis_client import get_redis
+from repo import TokenRevocationRepo
+from repo.user_cache import UserCache
+from services.token_reaper_service import TokenReaperService
+from services.last_login_service import LastLoginService
+from services.user_import_service import shutdown_import_executor
+from utils.task_utils import wait_background_tasks, run_periodically, cancel_tasks
+from utils.process_utils import MemoryWatchdog
+from common.logging import setup_logging
+import asyncio
 import logging
+import os
+import time
 
 setting = get_settings()
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    service_tasks = []
+
+    if not logging.getLogger().handlers:
+        # Worker do uvicorn spawn (WORKERS > 1, reload) không kế thừa logging của main.py:
+        # gửi record về main.py qua LOG_SOCKET, chỉ process đó ghi file log
+        setup_logging(log_dir=None, log_file=None, log_socket=setting.LOG_SOCKET or None)
+
+    # Engine + Redis pool: 1 lần mỗi worker, mở sẵn vài connection
+    database = get_database()
+    redis_client = get_redis()
+    try:
+        await database.warm_up(setting.DB_POOL_PREWARM)
+    except Exception as e:
+        logger.error("Database warm-up failed: %s", e)
+    try:
+        await redis_client.warm_up(setting.REDIS_POOL_PREWARM)
+    except Exception as e:
+        logger.error("Redis warm-up failed: %s", e)
+
+    if is_asymmetric(setting.JWT_ALGORITHM):
+        # Load/create signing keys, then pick up rotations made by any worker
+        key_store = await asyncio.to_thread(get_key_store)
+        service_tasks.append(asyncio.create_task(run_periodically(
+            lambda: asyncio.to_thread(key_store.refresh),
+            min(60, setting.JWT_KEY_ROTATION_SEC), "jwt-key-rotation")))
+
+    service_tasks.append(asyncio.create_task(run_periodically(
+        TokenRevocationRepo.sync_bloom, setting.REVOCATION_BLOOM_SYNC_SEC, "revocation-bloom-sync",
+        run_immediately=True)))
+    service_tasks.append(asyncio.create_task(UserCache.listen_invalidations()))
+    service_tasks.append(asyncio.create_task(run_periodically(
+        LastLoginService.flush, setting.LAST_LOGIN_FLUSH_SEC, "last-login-flush")))
+
+    if setting.WORKER_MAX_MEMORY_MB and setting.WORKERS > 1:
+        service_tasks.append(asyncio.create_task(run_periodically(
+            MemoryWatchdog(setting.WORKER_MAX_MEMORY_MB).check, setting.WORKER_MEMORY_CHECK_SEC,
+            "memory-watchdog")))
+
+    if setting.TOKEN_REAPER_ENABLED:
+        service_tasks.append(asyncio.create_task(run_periodically(
+            TokenReaperService.reap, setting.TOKEN_REAPER_INTERVAL_SEC, "user-tokens-reaper")))
+
+    app.state.startup_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("Worker %s started in %s ms", os.getpid(), app.state.startup_ms)
+
+    yield
+
+    await cancel_tasks(service_tasks)
+    await wait_background_tasks()
+    try:
+        await LastLoginService.flush()
+    except Exception as e:
+        logger.error("Final last login flush failed: %s", e)
+    shutdown_hash_pool()
+    shutdown_import_executor()
+    await redis_client.close()
+    await database.dispose()
+
+
 # Khởi tạo FastAPI app
-app = FastAPI(title=get_settings().SERVICE_NAME)
+app = FastAPI(title=get_settings().SERVICE_NAME, lifespan=lifespan,
+              default_response_class=TimedJSONResponse)
 
-app.add_middleware(RequestIDMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(MetricsMiddleware)
+# Ngoài cùng: request_id / Server-Timing có hiệu lực cho mọi middleware bên trong
+app.add_middleware(RequestContextMiddleware)
 
 app.include_router(api_v1_router)
+app.include_router(well_known_routes.router, tags=['well-known'])
 
 @app.get("/health")
 async def health():
-    logger.info("Health check OK")
-    return {"status": "ok"}
+    logger.debug("Health check OK")
+    return {"status": "ok", "redis": get_redis().breaker.state,
+            "startup_ms": getattr(app.state, "startup_ms", None)}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/health/db-pool")
+async def db_pool_health():
+    # Số liệu của worker process hiện tại
+    return {"pid": os.getpid(), "pools": get_database().pool_metrics()}
+
+@app.get("/health/caches")
+async def caches_health():
+    # Số liệu của worker process hiện tại; tổng mọi worker ở /metrics (cache_lookups_total)
+    return {"pid": os.getpid(),
+            "caches": {"user": UserCache.local_stats(), "token": get_token_cache().stats()}}
@@ -0,0 +1,109 @@
+"""
+Compare FastAPI's default envelope serialization with the fast path
+(api.responses.ModelJSONResponse) through the real ASGI stack.
+
+Both routes return the same ApiResponse envelope; the default one goes through
+response_model validation, jsonable_encoder and json.dumps. The command checks
+that both produce the same bytes and prints the time per request.
+"""
+from datetime import datetime, timezone
+import asyncio
+import logging
+import statistics
+import time
+
+from fastapi import FastAPI
+
+from api.responses import ModelJSONResponse
+from schemas import ApiResponse, LoginResponse, UserRead, UserStatus
+
+logger = logging.getLogger(__name__)
+
+
+def _payloads() -> dict:
+    now = datetime(2025, 1, 10, 8, 30, tzinfo=timezone.utc)
+    return {
+        "login": (LoginResponse, LoginResponse(
+            access_token="a" * 300, refresh_token="r" * 250, token_type="Bearer", expires_in=900)),
+        "user": (UserRead, UserRead(
+            id="3f2b1c9e-1f0a-4a51-9b1e-2d4c5e6f7a8b", email="user@example.com",
+            user_name="Nguyễn Văn A", status=UserStatus.active,
+            created_at=now, updated_at=now, last_login_at=now)),
+    }
+
+
+def _add_routes(app: FastAPI, name: str, envelope_type, envelope):
+    @app.get(f"/default/{name}", response_model=envelope_type)
+    async def default_route():
+        return envelope
+
+    @app.get(f"/fast/{name}", response_model=envelope_type)
+    async def fast_route():
+        return ModelJSONResponse(envelope)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    for name, (model, data) in _payloads().items():
+        envelope_type = ApiResponse[model]
+        _add_routes(app, name, envelope_type, envelope_type(success=True, data=data))
+    return app
+
+
+async def call(app: FastAPI, path: str) -> bytes:
+    """
+    One GET through the ASGI app, without a server or HTTP client
+    """
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("bench", 80)}
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+async def bench(requests: int, rounds: int) -> int:
+    app = build_app()
+    mismatches = 0
+    for name in _payloads():
+        default_body = await call(app, f"/default/{name}")
+        fast_body = await call(app, f"/fast/{name}")
+        if default_body != fast_body:
+            mismatches += 1
+            print(f"{name}: OUTPUT DIFFERS\n  default: {default_body!r}\n  fast:    {fast_body!r}")
+
+        results = {}
+        for mode in ("default", "fast"):
+            path = f"/{mode}/{name}"
+            samples = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                for _ in range(requests):
+                    await call(app, path)
+                samples.append((time.perf_counter() - start) / requests * 1e6)
+            results[mode] = statistics.median(samples)
+
+        saved = results["default"] - results["fast"]
+        print(f"{name:6} {len(default_body):5} bytes  default {results['default']:8.1f} us/req  "
+              f"fast {results['fast']:8.1f} us/req  saved {saved:6.1f} us ({saved / results['default']:.0%})")
+    return 1 if mismatches else 0
+
+
+def run(args) -> int:
+    return asyncio.run(bench(args.requests, args.rounds))
+
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("bench-responses",
+                                   help="Benchmark default vs fast ApiResponse serialization")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per round")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds per route (median is reported)")
+    parser.set_defaults(func=run)
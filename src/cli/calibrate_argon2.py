@@ -0,0 +1,103 @@
+"""
+Benchmark Argon2 on this machine and suggest cost parameters.
+
+The suggestion keeps the verify latency under `target_ms` while `concurrency`
+logins are verified at the same time, and the memory of all those concurrent
+verifies under `max_memory_mib`.
+"""
+from argon2 import PasswordHasher, Type
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+import logging
+import os
+import statistics
+import time
+
+logger = logging.getLogger(__name__)
+
+# Candidate memory costs (MiB), largest first: memory hardness matters more
+# than time_cost against GPU attacks, so we keep as much as the budget allows
+MEMORY_CANDIDATES_MIB = (256, 128, 64, 46, 32, 19)
+MAX_TIME_COST = 10
+
+
+@dataclass
+class Calibration:
+    time_cost: int
+    memory_cost: int  # KiB
+    parallelism: int
+    latency_ms: float
+
+    def to_env(self) -> str:
+        return (f"ARGON2_TIME_COST={self.time_cost}\n"
+                f"ARGON2_MEMORY_COST={self.memory_cost}\n"
+                f"ARGON2_PARALLELISM={self.parallelism}")
+
+
+def measure_latency(ph: PasswordHasher, concurrency: int, rounds: int) -> float:
+    """
+    Median verify latency (ms) with `concurrency` verifies running in parallel
+    """
+    encoded = ph.hash("calibration-password")
+
+    def verify_once(_):
+        start = time.perf_counter()
+        ph.verify(encoded, "calibration-password")
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(verify_once, range(concurrency * rounds)))
+    return statistics.median(samples)
+
+
+def calibrate(target_ms: float, concurrency: int, max_memory_mib: int,
+              rounds: int = 3, cpu_count: Optional[int] = None) -> Optional[Calibration]:
+    cpu_count = cpu_count or os.cpu_count() or 1
+    # Lanes beyond the free cores only add scheduling overhead
+    parallelism = max(1, min(4, cpu_count // max(1, concurrency)))
+
+    for memory_mib in MEMORY_CANDIDATES_MIB:
+        if memory_mib * concurrency > max_memory_mib:
+            continue
+
+        best: Optional[Calibration] = None
+        for time_cost in range(1, MAX_TIME_COST + 1):
+            ph = PasswordHasher(time_cost=time_cost, memory_cost=memory_mib * 1024,
+                                parallelism=parallelism, hash_len=32, type=Type.ID)
+            latency = measure_latency(ph, concurrency, rounds)
+            logger.info("m=%sMiB t=%s p=%s -> %.1f ms", memory_mib, time_cost, parallelism, latency)
+            if latency > target_ms:
+                break
+            best = Calibration(time_cost, memory_mib * 1024, parallelism, latency)
+
+        if best:
+            return best
+
+    return None
+
+
+def run(args) -> int:
+    result = calibrate(target_ms=args.target_ms,
+                       concurrency=args.concurrency,
+                       max_memory_mib=args.max_memory_mib,
+                       rounds=args.rounds)
+    if result is None:
+        print("No parameter set meets the target, raise --target-ms or --max-memory-mib")
+        return 1
+
+    print(f"# median verify latency {result.latency_ms:.1f} ms "
+          f"at concurrency {args.concurrency}")
+    print(result.to_env())
+    return 0
+
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("calibrate-argon2", help="Suggest Argon2 cost parameters for this machine")
+    parser.add_argument("--target-ms", type=float, default=250, help="Max median verify latency")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1,
+                        help="Verifies running at the same time")
+    parser.add_argument("--max-memory-mib", type=int, default=1024,
+                        help="Memory budget for all concurrent verifies")
+    parser.add_argument("--rounds", type=int, default=3, help="Verifies per worker per candidate")
+    parser.set_defaults(func=run)
@@ -0,0 +1,48 @@
+"""
+Bulk import users from a CSV (with header) or NDJSON file.
+
+Columns / keys: email, user_name, password | password_hash, status
+"""
+import asyncio
+
+from common.setting import get_settings
+
+setting = get_settings()
+
+
+async def _file_lines(path: str):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+async def _import(args):
+    from db.database import get_database
+    from services.user_import_service import UserImportService, new_import_executor
+
+    with new_import_executor(args.workers) as executor:
+        return await UserImportService.import_users(
+            get_database().async_session, _file_lines(args.path), args.format,
+            executor, batch_size=args.batch_size)
+
+
+def run(args) -> int:
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    args.format = fmt
+    result = asyncio.run(_import(args))
+
+    for error in result.errors:
+        print(f"line {error.line} ({error.email}): {error.error}")
+    print(f"total {result.total}, imported {result.imported}, failed {result.failed}")
+    return 0 if result.failed == 0 else 1
+
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("import-users", help="Bulk import users from CSV/NDJSON")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None,
+                        help="Default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=setting.IMPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=setting.IMPORT_HASH_WORKERS,
+                        help="Hashing processes (0 = number of CPUs)")
+    parser.set_defaults(func=run)
@@ -0,0 +1,77 @@
+"""
+Maintenance commands for the user_tokens table and user roles.
+"""
+from sqlalchemy import text
+import asyncio
+
+from common.setting import get_settings
+from db import token_partitions
+from db.migrate import build_migration_engine
+from schemas.user import UserRole
+
+setting = get_settings()
+
+
+def run_reap_tokens(args) -> int:
+    from services.token_reaper_service import TokenReaperService
+
+    deleted = asyncio.run(TokenReaperService.reap(batch_size=args.batch_size,
+                                                  pause_sec=args.pause_sec,
+                                                  max_batches=args.max_batches))
+    print(f"deleted {deleted} expired tokens")
+    return 0
+
+
+def run_partition_tokens(args) -> int:
+    engine = build_migration_engine()
+    try:
+        with engine.connect() as conn:
+            if args.enable:
+                token_partitions.enable_partitioning(conn, args.days_ahead)
+            elif not token_partitions.is_partitioned(conn):
+                print("user_tokens is not partitioned, use --enable")
+                return 1
+            token_partitions.ensure_future_partitions(conn, args.days_ahead)
+            dropped = token_partitions.drop_expired_partitions(conn)
+            conn.commit()
+            print(f"partitions: {[name for name, _ in token_partitions.list_partitions(conn)]}")
+            print(f"dropped: {dropped}")
+    finally:
+        engine.dispose()
+    return 0
+
+
+def run_set_role(args) -> int:
+    engine = build_migration_engine()
+    try:
+        with engine.begin() as conn:
+            result = conn.execute(text("UPDATE `users` SET `role` = :role WHERE `email` = :email"),
+                                  {"role": args.role, "email": args.email})
+    finally:
+        engine.dispose()
+    if not result.rowcount:
+        print(f"no user with email {args.email}")
+        return 1
+    # Token đang dùng giữ role cũ tới khi hết hạn / refresh
+    print(f"{args.email} is now {args.role}, effective from the next login or refresh")
+    return 0
+
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("reap-tokens", help="Delete expired user_tokens in batches")
+    parser.add_argument("--batch-size", type=int, default=setting.TOKEN_REAPER_BATCH_SIZE)
+    parser.add_argument("--pause-sec", type=float, default=setting.TOKEN_REAPER_PAUSE_SEC)
+    parser.add_argument("--max-batches", type=int, default=1_000_000)
+    parser.set_defaults(func=run_reap_tokens)
+
+    parser = subparsers.add_parser("partition-tokens",
+                                   help="Partition user_tokens by expire_at and rotate partitions")
+    parser.add_argument("--enable", action="store_true",
+                        help="Convert the table to daily partitions (rebuilds the table)")
+    parser.add_argument("--days-ahead", type=int, default=setting.TOKEN_PARTITION_DAYS_AHEAD)
+    parser.set_defaults(func=run_partition_tokens)
+
+    parser = subparsers.add_parser("set-role", help="Change the role issued in a user's tokens")
+    parser.add_argument("email")
+    parser.add_argument("role", choices=[role.value for role in UserRole])
+    parser.set_defaults(func=run_set_role)
@@ -0,0 +1,50 @@
+"""
+Schema migration commands, run at deploy time before the new version serves.
+"""
+import logging
+
+from db.migrate import (build_migration_engine, prepare_schema, pending_migrations,
+                        applied_revisions, check_indexes)
+
+logger = logging.getLogger(__name__)
+
+
+def run_migrate(args) -> int:
+    if not args.status:
+        applied = prepare_schema(target=args.target)
+        print(f"applied: {applied or 'nothing to do'}")
+        return 0
+
+    engine = build_migration_engine()
+    try:
+        with engine.connect() as conn:
+            print(f"applied: {applied_revisions(conn)}")
+            for m in pending_migrations(conn, args.target):
+                print(f"pending: {m.REVISION:04d} {m.DESCRIPTION}")
+        return 0
+    finally:
+        engine.dispose()
+
+
+def run_check_indexes(args) -> int:
+    engine = build_migration_engine()
+    try:
+        missing = check_indexes(engine)
+    finally:
+        engine.dispose()
+
+    for table, columns, used_by in missing:
+        print(f"missing index on {table} ({', '.join(columns)}) used by {used_by}")
+    if not missing:
+        print("all expected indexes present")
+    return 1 if missing else 0
+
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    parser.add_argument("--target", type=int, default=None, help="Stop at this revision")
+    parser.add_argument("--status", action="store_true", help="Only list applied/pending migrations")
+    parser.set_defaults(func=run_migrate)
+
+    parser = subparsers.add_parser("check-indexes", help="Report indexes missing for repo queries")
+    parser.set_defaults(func=run_check_indexes)
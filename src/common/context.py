@@ -3,3 +3,15 @@ import contextvars
 
 # Context variable lưu request_id cho mỗi request
 request_id_ctx = contextvars.ContextVar("request_id", default="-")
+
+# Request-scoped {"wrote": bool}: set khi request ghi vào primary DB (read-your-writes)
+db_write_ctx = contextvars.ContextVar("db_write", default=None)
+
+# Request-scoped {name: seconds} cộng dồn thời gian DB / Redis / hash... cho header Server-Timing
+server_timing_ctx = contextvars.ContextVar("server_timing", default=None)
+
+
+def add_server_timing(name: str, seconds: float):
+    timings = server_timing_ctx.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
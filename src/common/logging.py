@@ -1,9 +1,23 @@
+import atexit
+import json
 import logging
+import queue
+import shutil
+import socket
+import socketserver
+import struct
 import sys
 import os
-from logging.handlers import RotatingFileHandler
+import tempfile
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, SocketHandler
+from typing import Dict, Optional
 from common.context import request_id_ctx
 
+# Listener thread hiện tại (setup_logging gọi lại thì dừng cái cũ)
+_listener: Optional[QueueListener] = None
+
 
 class RenameLoggerFilter(logging.Filter):
     """
@@ -20,19 +34,164 @@ class RequestIDFilter(logging.Filter):
         return True
 
 
-def setup_logging(log_level=logging.INFO, log_dir="logs", log_file="app.log"):
+class RateLimitFilter(logging.Filter):
+    """
+    Per-logger token bucket for chatty loggers: at most `rate` records per
+    second (burst of `rate`) for a logger name or any of its children.
+    WARNING and above always pass. Dropped records are counted and reported
+    on the next record that passes.
+    """
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._buckets: Dict[str, list] = {}  # prefix -> [tokens, last refill, dropped]
+        self._lock = threading.Lock()
+
+    def _rule(self, name: str) -> Optional[str]:
+        while name:
+            if name in self.rates:
+                return name
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        prefix = self._rule(record.name)
+        if prefix is None:
+            return True
+
+        rate = self.rates[prefix]
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(prefix, [rate, now, 0])
+            bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            dropped, bucket[2] = bucket[2], 0
+
+        if dropped:
+            record.msg = f"{record.msg} [{dropped} similar records dropped]"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Record từ worker process: traceback đã được format sẵn
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _LoopQueueHandler(QueueHandler):
+    """
+    Runs in the caller (event loop) thread: only filters and merges the
+    message args, the line formatting and disk/console I/O happen in the
+    listener thread.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args ngay (object có thể bị sửa trước khi listener format)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _JsonSocketHandler(SocketHandler):
+    """
+    Sends records to the parent process (see start_log_server) as
+    length-prefixed JSON instead of pickles.
+    """
+    def makePickle(self, record: logging.LogRecord) -> bytes:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        entry = dict(record.__dict__, msg=record.getMessage(), args=None, exc_info=None)
+        data = json.dumps(entry, ensure_ascii=False, default=str).encode()
+        return struct.pack(">L", len(data)) + data
+
+
+class _LogRecordStreamHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            header = self.rfile.read(4)
+            if len(header) < 4:
+                return
+            length = struct.unpack(">L", header)[0]
+            data = self.rfile.read(length)
+            if len(data) < length:
+                return
+            listener = _listener
+            if listener is not None:
+                # Đi thẳng vào queue của listener: worker đã lọc / rate-limit rồi
+                listener.queue.put_nowait(logging.makeLogRecord(json.loads(data)))
+
+
+def start_log_server() -> Optional[str]:
+    """
+    Receive the records of spawned worker processes on a Unix socket and write
+    them through this process's handlers, so one process owns (and rotates)
+    the log file. Returns the socket path, None where Unix sockets are missing.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    # mkdtemp tạo dir 0700: chỉ user hiện tại kết nối được
+    socket_dir = tempfile.mkdtemp(prefix="log-")
+    path = os.path.join(socket_dir, "log.sock")
+    server = socketserver.ThreadingUnixStreamServer(path, _LogRecordStreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="log-server", daemon=True).start()
+
+    def _stop():
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(socket_dir, ignore_errors=True)
+
+    # atexit chạy ngược thứ tự: dừng server trước, stop_logging flush queue sau
+    atexit.register(_stop)
+    return path
+
+
+def stop_logging():
+    """
+    Flush queued records and stop the listener thread
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(log_level=logging.INFO, log_dir="logs", log_file="app.log",
+                  json_format: Optional[bool] = None, rate_limits: Optional[Dict[str, float]] = None,
+                  log_socket: Optional[str] = None):
+    from common.setting import get_settings
+
+    global _listener
+    settings = get_settings()
+    json_format = settings.LOG_JSON if json_format is None else json_format
+    rate_limits = settings.LOG_RATE_LIMITS if rate_limits is None else rate_limits
+
     log_format = "%(asctime)s | %(levelname)-8s | %(name)s | [req=%(request_id)s] %(message)s"
+    formatter = JsonFormatter() if json_format else logging.Formatter(log_format)
 
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(logging.Formatter(log_format))
+    console_handler.setFormatter(formatter)
     console_handler.addFilter(RenameLoggerFilter())
-    console_handler.addFilter(RequestIDFilter())
-
-    config = {
-        "level": log_level,
-        "format": log_format,
-        "handlers": [console_handler],
-    }
+    handlers = [console_handler]
 
     if log_dir and log_file:
         os.makedirs(log_dir, exist_ok=True)
@@ -44,12 +203,26 @@ def setup_logging(log_level=logging.INFO, log_dir="logs", log_file="app.log"):
             backupCount=5,
             encoding="utf-8"
         )
-        file_handler.setFormatter(logging.Formatter(log_format))
+        file_handler.setFormatter(formatter)
         file_handler.addFilter(RenameLoggerFilter())
-        file_handler.addFilter(RequestIDFilter())
-        config["handlers"].append(file_handler)
+        handlers.append(file_handler)
+
+    if log_socket:
+        # Worker process: process cha ghi console + file
+        handlers = [_JsonSocketHandler(log_socket, None)]
+
+    stop_logging()
+    log_queue = queue.SimpleQueue()
+    queue_handler = _LoopQueueHandler(log_queue)
+    # request_id phải lấy ở thread gọi log (contextvar), trước khi vào queue
+    queue_handler.addFilter(RequestIDFilter())
+    queue_handler.addFilter(RateLimitFilter(rate_limits))
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
 
-    logging.basicConfig(**config)
+    logging.basicConfig(level=log_level, handlers=[queue_handler], force=True)
 
     # Reduce noise
     logging.getLogger("uvicorn.access").setLevel(logging.INFO)
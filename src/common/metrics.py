@@ -0,0 +1,79 @@
+"""
+Prometheus metrics.
+
+Counters and histograms only: prometheus_client updates them without a shared
+lock between requests. With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR
+(main.py does it from METRICS_MULTIPROC_DIR) so every worker writes its own
+mmap file and /metrics sums them.
+"""
+from contextlib import contextmanager
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess, REGISTRY)
+from typing import Optional
+import os
+import time
+
+from common.context import add_server_timing
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route"], buckets=LATENCY_BUCKETS)
+HTTP_REQUESTS_TOTAL = Counter(
+    "http_requests_total", "HTTP requests by route template and status code",
+    ["method", "route", "status"])
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "SQL statement latency by statement type",
+    ["statement"], buckets=LATENCY_BUCKETS)
+
+REDIS_CALL_SECONDS = Histogram(
+    "redis_call_duration_seconds", "Redis call latency (command or pipeline) by caller",
+    ["operation", "outcome"], buckets=LATENCY_BUCKETS)
+
+CRYPTO_SECONDS = Histogram(
+    "auth_crypto_duration_seconds", "Argon2 hash/verify and JWT encode/decode latency",
+    ["operation"], buckets=LATENCY_BUCKETS)
+
+CACHE_LOOKUPS_TOTAL = Counter(
+    "cache_lookups_total", "In-process cache lookups by cache and result (hit/miss)",
+    ["cache", "result"])
+CACHE_EVICTIONS_TOTAL = Counter(
+    "cache_evictions_total", "In-process cache entries evicted because the cache was full",
+    ["cache"])
+
+SQL_STATEMENT_TYPES = ("select", "insert", "update", "delete")
+
+
+def statement_type(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return keyword if keyword in SQL_STATEMENT_TYPES else "other"
+
+
+@contextmanager
+def observe(histogram, *labels, server_timing: Optional[str] = None):
+    """
+    Time the block into `histogram`, and into the request's Server-Timing entry if given
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.labels(*labels).observe(elapsed)
+        if server_timing:
+            add_server_timing(server_timing, elapsed)
+
+
+def render_metrics() -> tuple:
+    """
+    Returns:
+        (body, content_type) of the Prometheus text exposition
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Dict
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
 load_dotenv()
@@ -13,21 +14,53 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PW: str
     DB_NAME: str
+    DB_POOL_SIZE: int = 10  # per worker process and per engine (primary, each replica)
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SEC: float = 5  # wait for a free connection before failing
+    DB_POOL_RECYCLE_SEC: int = 3600
+    DB_POOL_PREWARM: int = 2  # connections opened per engine at worker startup
+    DB_MIGRATE_ON_START: bool = False  # migrate in a deploy step (`python manage.py migrate`); True = main.py does it before serving
+    DB_REPLICA_HOSTS: str = ""  # "host[:port],host[:port]" of read replicas, same user/db
+    DB_READ_YOUR_WRITES_SEC: float = 5  # reads go to primary this long after a client writes
     
     # Service
     HOST: str
     PORT: int
     DEBUG_MODE: bool = False
+    WORKERS: int = 0  # uvicorn worker processes, 0 = number of CPUs (1 in DEBUG_MODE)
+    WORKER_MAX_REQUESTS: int = 0  # recycle a worker after this many requests, 0 = never
+    WORKER_MAX_MEMORY_MB: int = 0  # recycle a worker above this RSS, 0 = never
+    WORKER_MEMORY_CHECK_SEC: int = 30
+    WORKER_GRACEFUL_TIMEOUT_SEC: int = 30  # wait for in-flight requests on shutdown/restart
     SERVICE_NAME: str = 'auth_service'
+    METRICS_MULTIPROC_DIR: str = ""  # Prometheus multiprocess dir, a temp dir is created when empty and WORKERS > 1
+    FAST_RESPONSES: bool = False  # dump ApiResponse envelopes directly (see api/responses.py)
+    LOG_DIR: str = ""  # empty = ./log/<SERVICE_NAME>
+    LOG_FILE: str = ""  # empty = <SERVICE_NAME>.log
+    LOG_SOCKET: str = ""  # set by main.py: workers send their records to the main process
+    LOG_JSON: bool = False  # JSON lines instead of the text format
+    LOG_RATE_LIMITS: Dict[str, float] = {}  # logger name -> max INFO/DEBUG records per second
     
     # Auth Token
     PEPPER: str = 'pepsi'
     
     # JWT / token
     JWT_SECRET: str
-    JWT_ALGORITHM: str = "HS256"
+    JWT_ALGORITHM: str = "HS256"  # HS256 | EdDSA | RS256
+    JWT_KEYS_DIR: str = "./keys"  # shared by all workers for EdDSA/RS256
+    JWT_KEY_ROTATION_SEC: int = 24 * 3600
+    JWT_KEY_OVERLAP_SEC: int = 7 * 24 * 3600  # >= refresh token lifetime
+    JWKS_MAX_AGE_SEC: int = 3600  # < JWT_KEY_ROTATION_SEC
     ACCESS_TOKEN_EXPIRES_SECONDS: int = 900  # 15m
     REFRESH_TOKEN_EXPIRES_DAY: int = 7  # 30 days
+    TOKEN_CACHE_SIZE: int = 10000  # verified tokens kept in memory
+    INTROSPECT_MAX_TOKENS: int = 100
+
+    # Revoked refresh tokens (Redis + per-worker Bloom filter)
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.01
+    REVOCATION_BLOOM_SYNC_SEC: int = 30  # add newly revoked ids
+    REVOCATION_BLOOM_REBUILD_SEC: int = 3600  # full rebuild, also how long the revocation log is kept
     
     # Redis
     REDIS_HOST: str = "localhost"
@@ -35,6 +68,58 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0  # 15m
     DECODE_RESPONSES: bool = True
     TOKEN_TTL_SEC: int = 5 * 60
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_PREWARM: int = 2  # connections opened at worker startup
+    REDIS_POOL_TIMEOUT_SEC: float = 0.2  # wait for a free pooled connection
+    REDIS_CONNECT_TIMEOUT_SEC: float = 0.5
+    REDIS_SOCKET_TIMEOUT_SEC: float = 0.5
+    REDIS_BREAKER_FAILURES: int = 5  # consecutive failures before opening
+    REDIS_BREAKER_RESET_SEC: float = 5.0  # open -> half-open probe
+
+    # Argon2 cost, tune with `python manage.py calibrate-argon2`
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 64 * 1024  # KiB
+    ARGON2_PARALLELISM: int = 2
+
+    USER_BATCH_MAX_IDS: int = 100  # /user/batch
+    USER_LIST_MAX_LIMIT: int = 500  # page size of GET /user
+    USER_STREAM_CHUNK: int = 1000  # rows fetched per round trip when streaming
+
+    # User cache (per-worker TTL/LRU in front of Redis)
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_LOCAL_SIZE: int = 10000
+    USER_CACHE_LOCAL_TTL_SEC: int = 30
+    USER_CACHE_REDIS_TTL_SEC: int = 300
+
+    # Expired user_tokens reaper
+    TOKEN_REAPER_ENABLED: bool = True
+    TOKEN_REAPER_INTERVAL_SEC: int = 300
+    TOKEN_REAPER_BATCH_SIZE: int = 500
+    TOKEN_REAPER_PAUSE_SEC: float = 0.2  # between batches
+    TOKEN_REAPER_MAX_BATCHES: int = 200  # per run
+    TOKEN_PARTITION_DAYS_AHEAD: int = 7
+
+    # Write-behind of last_login_at (one batched UPDATE per flush)
+    LAST_LOGIN_FLUSH_SEC: float = 5
+    LAST_LOGIN_FLUSH_BATCH: int = 1000  # users per UPDATE
+
+    # Bulk user import
+    IMPORT_BATCH_SIZE: int = 500
+    IMPORT_HASH_WORKERS: int = 0  # 0 = number of CPUs
+    IMPORT_MAX_ERRORS: int = 1000  # row errors kept in the report
+
+    # Login throttling (sliding window, per email and per client IP)
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_WINDOW_SEC: int = 60
+    LOGIN_RATE_LIMIT_PER_EMAIL: int = 5
+    LOGIN_RATE_LIMIT_PER_IP: int = 30
+    LOGIN_RATE_LOCAL_MAX_KEYS: int = 100000  # in-process fallback while Redis is down
+
+    # Password hashing worker pool
+    HASH_POOL_KIND: str = "thread"  # 'thread' | 'process'
+    HASH_POOL_SIZE: int = 0  # 0 = number of CPUs / WORKERS
+    HASH_QUEUE_SIZE: int = 64  # jobs waiting for a free worker
+    HASH_TIMEOUT_SEC: float = 2.0
 
 
 
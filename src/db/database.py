@@ -1,15 +1,75 @@
+from contextlib import AsyncExitStack
 from functools import lru_cache
-from sqlalchemy import create_engine, text
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from typing import List, Tuple
+import itertools
 import logging
+import time
+from common.context import add_server_timing, db_write_ctx
+from common.metrics import DB_QUERY_SECONDS, statement_type
 from common.setting import get_settings
+from db.pool import InstrumentedAsyncPool
 
 
 
 logger = logging.getLogger(__name__)
 Base = declarative_base()
 
+# Cookie giữ mốc (epoch sec) tới khi client còn phải đọc từ primary
+READ_YOUR_WRITES_COOKIE = "db_rw_until"
+
+
+def _mark_request_wrote():
+    state = db_write_ctx.get()
+    if state is not None:
+        state["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_request_wrote()
+
+
+@event.listens_for(Session, "after_flush")
+def _on_flush(session, flush_context):
+    if session.new or session.dirty or session.deleted:
+        _mark_request_wrote()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERY_SECONDS.labels(statement_type(statement)).observe(elapsed)
+    add_server_timing("db", elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _on_query_error(exception_context):
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def parse_replica_hosts(value: str, default_port: int) -> List[Tuple[str, int]]:
+    hosts = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        hosts.append((host, int(port) if port else default_port))
+    return hosts
+
 
 def build_connection_str(user, password, host, port, db=None, isAsync=False):
     """
@@ -29,14 +89,29 @@ class MysqlDatabase:
         self._port = settings.DB_PORT
         self._db_name = settings.DB_NAME
         
-        self.create_database()
-        self.create_tables()
+        # Chỉ tạo engine (chưa mở connection). Tạo DB / migrate schema là việc
+        # của deploy (`python manage.py migrate`), không chạy khi serve
         self.create_async_engine_with_db()
         self.create_async_session()
+        self.create_replica_sessions(settings.DB_REPLICA_HOSTS)
+        self._read_your_writes_sec = settings.DB_READ_YOUR_WRITES_SEC
         
         logger.info("Init instance database")
 
 
+    def _pool_options(self) -> dict:
+        settings = get_settings()
+        return dict(
+            poolclass=InstrumentedAsyncPool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SEC,
+            pool_recycle=settings.DB_POOL_RECYCLE_SEC,
+            pool_pre_ping=True,
+            future=True,
+        )
+
+
     def create_async_engine_with_db(self):
         # Main engine (connected to target DB)
         self.async_engine = create_async_engine(
@@ -45,9 +120,7 @@ class MysqlDatabase:
                 self._host, self._port, 
                 self._db_name, isAsync=True
             ),
-            pool_pre_ping=True,
-            pool_recycle=3600,
-            future=True
+            **self._pool_options()
         )
         logger.info("Create async engine")
         
@@ -60,51 +133,110 @@ class MysqlDatabase:
         logger.info("Create async session")
         
 
-    def create_database(self):
+    def create_replica_sessions(self, replica_hosts: str):
+        # Read replicas (round robin); không cấu hình thì đọc từ primary
+        self.replica_engines = [
+            create_async_engine(
+                build_connection_str(
+                    self._username, self._password,
+                    host, port,
+                    self._db_name, isAsync=True
+                ),
+                **self._pool_options()
+            )
+            for host, port in parse_replica_hosts(replica_hosts, self._port)
+        ]
+        self.replica_sessions = [
+            sessionmaker(
+                autocommit=False, autoflush=False, bind=engine,
+                expire_on_commit=False, class_=AsyncSession
+            )
+            for engine in self.replica_engines
+        ]
+        self._replica_cycle = itertools.cycle(self.replica_sessions) if self.replica_sessions else None
+        logger.info("Create %s read replica engine(s)", len(self.replica_engines))
+
+
+    @property
+    def engines(self) -> List[AsyncEngine]:
+        return [self.async_engine, *self.replica_engines]
+
+
+    async def warm_up(self, connections: int):
         """
-        Create the database if it does not exist.
+        Open `connections` pooled connections per engine so the first requests
+        do not pay the TCP + auth handshake
         """
-        root_engine = create_engine(
-            build_connection_str(self._username, self._password, 
-                                 self._host, self._port),
-            pool_pre_ping=True,
-        )
-        with root_engine.connect() as conn:
-            conn.execute(text(f"CREATE DATABASE IF NOT EXISTS `{self._db_name}`"))
-            conn.commit()
-        logger.info(f"Create the database {self._db_name}.")
+        for engine in self.engines:
+            async with AsyncExitStack() as stack:
+                for _ in range(min(connections, engine.pool.size())):
+                    conn = await stack.enter_async_context(engine.connect())
+                    await conn.execute(text("SELECT 1"))
+
+
+    async def dispose(self):
+        for engine in self.engines:
+            await engine.dispose()
+        logger.info("Disposed database engines")
 
 
-    def create_tables(self):
+    def pool_metrics(self) -> dict:
         """
-        Create tables if they do not exist.
+        Live pool metrics of this worker process, per engine
         """
-        root_engine = create_engine(
-            build_connection_str(self._username, self._password, self._host, 
-                                 self._port, self._db_name),
-            pool_pre_ping=True
-        )
-        Base.metadata.create_all(root_engine)
-        logger.info("Create tables")
+        metrics = {"primary": self.async_engine.pool.metrics()}
+        for i, engine in enumerate(self.replica_engines):
+            metrics[f"replica_{i}"] = engine.pool.metrics()
+        return metrics
 
 
-    async def get_db(self):
+    def read_session_factory(self, request: Request):
         """
-        Dependency for FastAPI: yields a DB session.
+        Replica session factory, or the primary one while the client is inside
+        its read-your-writes window (replicas may not have its write yet)
         """
-        async with self.async_session() as session:
-            try:
-                yield session
-                await session.commit()
-            except Exception:
-                await session.rollback()
-                raise
-            finally:
-                await session.close()
+        if self._replica_cycle is None:
+            return self.async_session
+        try:
+            read_primary_until = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+        except ValueError:
+            read_primary_until = 0
+        if read_primary_until > time.time():
+            return self.async_session
+        return next(self._replica_cycle)
+
 
 @lru_cache(maxsize=None)
 def get_database() -> MysqlDatabase:
     """
-    Cached singleton for MysqlDatabase instance
+    Cached singleton for MysqlDatabase instance (per process, created on first use)
     """
     return  MysqlDatabase()
+
+
+async def get_db():
+    """
+    Dependency for FastAPI: yields a DB session.
+    """
+    async with get_database().async_session() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+
+async def get_read_db(request: Request):
+    """
+    Dependency for FastAPI: yields a read-only DB session (replica when available).
+    Never commits.
+    """
+    async with get_database().read_session_factory(request)() as session:
+        try:
+            yield session
+        finally:
+            await session.rollback()
+            await session.close()
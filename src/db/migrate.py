@@ -0,0 +1,187 @@
+"""
+Versioned schema migrations.
+
+Each module in `db/migrations` named `vNNNN_<name>.py` defines `REVISION`,
+`DESCRIPTION` and `upgrade(conn)`. Applied revisions are recorded in
+`schema_migrations`. A MySQL named lock keeps two deploys from migrating at
+the same time. Index changes use online DDL (ALGORITHM=INPLACE, LOCK=NONE),
+so the tables stay readable and writable while they are built.
+"""
+from importlib import import_module
+from pathlib import Path
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import pkgutil
+
+from common.setting import get_settings
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_TABLE = "schema_migrations"
+LOCK_NAME = "auth_service_schema_migrations"
+LOCK_TIMEOUT_SEC = 60
+
+
+def build_migration_engine() -> Engine:
+    from db.database import build_connection_str
+
+    settings = get_settings()
+    return create_engine(
+        build_connection_str(settings.DB_USER, settings.DB_PW, settings.DB_HOST,
+                             settings.DB_PORT, settings.DB_NAME),
+        pool_pre_ping=True,
+    )
+
+
+def ensure_database():
+    """
+    Create the database if it does not exist.
+    """
+    from db.database import build_connection_str
+
+    settings = get_settings()
+    root_engine = create_engine(
+        build_connection_str(settings.DB_USER, settings.DB_PW, settings.DB_HOST, settings.DB_PORT),
+        pool_pre_ping=True,
+    )
+    try:
+        with root_engine.connect() as conn:
+            conn.execute(text(f"CREATE DATABASE IF NOT EXISTS `{settings.DB_NAME}`"))
+            conn.commit()
+    finally:
+        root_engine.dispose()
+    logger.info("Database %s ready", settings.DB_NAME)
+
+
+def prepare_schema(target: Optional[int] = None) -> List[int]:
+    """
+    Create the database and apply pending migrations, disposing the sync engines
+    """
+    ensure_database()
+    engine = build_migration_engine()
+    try:
+        applied = migrate(engine, target)
+    finally:
+        engine.dispose()
+    logger.info("Schema up to date, applied migrations: %s", applied or 'none')
+    return applied
+
+
+def load_migrations() -> list:
+    migrations_dir = Path(__file__).parent / "migrations"
+    modules = [import_module(f"db.migrations.{m.name}")
+               for m in pkgutil.iter_modules([str(migrations_dir)])
+               if m.name.startswith("v")]
+    modules.sort(key=lambda m: m.REVISION)
+    return modules
+
+
+def index_exists(conn: Connection, table: str, index_name: str) -> bool:
+    return conn.execute(text("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :index
+        LIMIT 1
+    """), {"table": table, "index": index_name}).first() is not None
+
+
+def column_exists(conn: Connection, table: str, column: str) -> bool:
+    return conn.execute(text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = :table AND column_name = :column
+        LIMIT 1
+    """), {"table": table, "column": column}).first() is not None
+
+
+def add_index(conn: Connection, table: str, index_name: str, columns: Sequence[str]):
+    """
+    Add an index without blocking reads/writes (skipped if it already exists)
+    """
+    if index_exists(conn, table, index_name):
+        logger.info("Index %s.%s already exists", table, index_name)
+        return
+    cols = ", ".join(f"`{c}`" for c in columns)
+    conn.execute(text(f"ALTER TABLE `{table}` ADD INDEX `{index_name}` ({cols}), "
+                      f"ALGORITHM=INPLACE, LOCK=NONE"))
+    logger.info("Added index %s.%s (%s)", table, index_name, cols)
+
+
+def _ensure_migration_table(conn: Connection):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS `{MIGRATION_TABLE}` (
+            `revision` INT NOT NULL PRIMARY KEY,
+            `description` VARCHAR(255) NOT NULL,
+            `applied_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+
+def applied_revisions(conn: Connection) -> List[int]:
+    _ensure_migration_table(conn)
+    return [row[0] for row in conn.execute(text(f"SELECT revision FROM `{MIGRATION_TABLE}` ORDER BY revision"))]
+
+
+def pending_migrations(conn: Connection, target: Optional[int] = None) -> list:
+    applied = set(applied_revisions(conn))
+    return [m for m in load_migrations()
+            if m.REVISION not in applied and (target is None or m.REVISION <= target)]
+
+
+def migrate(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """
+    Apply pending migrations in order, up to `target` (all if None)
+    """
+    done = []
+    with engine.connect() as conn:
+        got_lock = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"),
+                                {"name": LOCK_NAME, "timeout": LOCK_TIMEOUT_SEC}).scalar()
+        if got_lock != 1:
+            raise RuntimeError("Another process is running migrations")
+        try:
+            for migration in pending_migrations(conn, target):
+                logger.info("Applying migration %04d: %s", migration.REVISION, migration.DESCRIPTION)
+                migration.upgrade(conn)
+                conn.execute(text(f"INSERT INTO `{MIGRATION_TABLE}` (revision, description) "
+                                  f"VALUES (:revision, :description)"),
+                             {"revision": migration.REVISION, "description": migration.DESCRIPTION})
+                conn.commit()
+                done.append(migration.REVISION)
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+            conn.commit()
+    return done
+
+
+def _expected_indexes() -> List[Tuple[str, Tuple[str, ...], str]]:
+    from repo import user_repo, user_token_repo
+
+    return [*user_repo.QUERY_INDEXES, *user_token_repo.QUERY_INDEXES]
+
+
+def check_indexes(engine: Engine) -> List[Tuple[str, Tuple[str, ...], str]]:
+    """
+    Compare the indexes the repo queries need with the live schema.
+    An expectation is met when some index starts with the expected columns.
+
+    Returns:
+        list: (table, columns, used_by) of every missing index
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT table_name, index_name, column_name
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+            ORDER BY table_name, index_name, seq_in_index
+        """)).all()
+
+    indexes: Dict[Tuple[str, str], List[str]] = {}
+    for table, index_name, column in rows:
+        indexes.setdefault((table, index_name), []).append(column)
+
+    missing = []
+    for table, columns, used_by in _expected_indexes():
+        if not any(t == table and tuple(cols[:len(columns)]) == tuple(columns)
+                   for (t, _), cols in indexes.items()):
+            missing.append((table, columns, used_by))
+    return missing
@@ -0,0 +1,36 @@
+"""
+Baseline schema (what `Base.metadata.create_all` used to create).
+Existing databases already have these tables, so this is a no-op there.
+"""
+from sqlalchemy import text
+
+REVISION = 1
+DESCRIPTION = "initial users and user_tokens tables"
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS `users` (
+            `id` VARCHAR(36) NOT NULL,
+            `email` VARCHAR(255) NULL,
+            `user_name` VARCHAR(255) NULL,
+            `password` TEXT NOT NULL,
+            `status` ENUM('active','disabled','banned','pending') NOT NULL,
+            `created_at` DATETIME NOT NULL,
+            `updated_at` DATETIME NOT NULL,
+            `last_login_at` DATETIME NULL,
+            PRIMARY KEY (`id`),
+            UNIQUE (`email`)
+        )
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS `user_tokens` (
+            `id` VARCHAR(36) NOT NULL,
+            `user_id` VARCHAR(36) NULL,
+            `token` TEXT NULL,
+            `token_type` ENUM('access','refresh','confirm') NOT NULL,
+            `created_at` DATETIME NOT NULL,
+            `expire_at` DATETIME NOT NULL,
+            PRIMARY KEY (`id`)
+        )
+    """))
@@ -0,0 +1,13 @@
+"""
+Index for UserTokenRepo.verify_token / delete:
+WHERE user_id = ? AND token_type = ? AND expire_at >= ? ORDER BY expire_at
+"""
+from db.migrate import add_index
+
+REVISION = 2
+DESCRIPTION = "composite index on user_tokens (user_id, token_type, expire_at)"
+
+
+def upgrade(conn):
+    add_index(conn, "user_tokens", "idx_user_tokens_user_type_expire",
+              ["user_id", "token_type", "expire_at"])
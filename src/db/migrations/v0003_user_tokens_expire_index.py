@@ -0,0 +1,12 @@
+"""
+Index for the expired-token reaper:
+DELETE FROM user_tokens WHERE expire_at < ? LIMIT ?
+"""
+from db.migrate import add_index
+
+REVISION = 3
+DESCRIPTION = "index on user_tokens (expire_at) for the expired-token reaper"
+
+
+def upgrade(conn):
+    add_index(conn, "user_tokens", "idx_user_tokens_expire_at", ["expire_at"])
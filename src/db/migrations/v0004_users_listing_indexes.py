@@ -0,0 +1,14 @@
+"""
+Indexes for the keyset-paginated user listing (UserRepo.list_users / stream_users):
+ORDER BY created_at, id with optional status / last_login_at filters
+"""
+from db.migrate import add_index
+
+REVISION = 4
+DESCRIPTION = "users listing indexes (created_at, id), (status, created_at, id), (last_login_at)"
+
+
+def upgrade(conn):
+    add_index(conn, "users", "idx_users_created_id", ["created_at", "id"])
+    add_index(conn, "users", "idx_users_status_created_id", ["status", "created_at", "id"])
+    add_index(conn, "users", "idx_users_last_login", ["last_login_at"])
@@ -0,0 +1,22 @@
+"""
+Role of a user, put into the JWT `role` claim at login / refresh (`admin` passes require_admin)
+"""
+from sqlalchemy import text
+import logging
+
+from db.migrate import column_exists
+
+logger = logging.getLogger(__name__)
+
+REVISION = 5
+DESCRIPTION = "users.role column"
+
+
+def upgrade(conn):
+    if column_exists(conn, "users", "role"):
+        logger.info("Column users.role already exists")
+        return
+    # Thêm cột cuối bảng có default: INSTANT chỉ đổi metadata, không rebuild bảng
+    conn.execute(text("ALTER TABLE `users` "
+                      "ADD COLUMN `role` ENUM('user','admin') NOT NULL DEFAULT 'user', "
+                      "ALGORITHM=INSTANT"))
@@ -2,70 +2,205 @@
 from functools import lru_cache
 
 import redis.asyncio as redis
-from typing import Optional
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from typing import Awaitable, Callable, Optional, TypeVar
+import asyncio
+import logging
+import time
 
+from common.context import add_server_timing
+from common.metrics import REDIS_CALL_SECONDS
 from common.setting import get_settings
 
 setting = get_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Lỗi kết nối -> tính vào circuit breaker; lỗi khác (ResponseError...) thì không
+CONNECTION_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError, asyncio.TimeoutError)
+
+
+class RedisUnavailableError(Exception):
+    """Redis is down or the circuit breaker is open"""
+
+
+class RedisPoolExhaustedError(RedisUnavailableError):
+    """No pooled connection freed up within REDIS_POOL_TIMEOUT_SEC (Redis itself may be fine)"""
+
+
+def is_pool_timeout(error: Exception, pool_was_full: bool) -> bool:
+    # BlockingConnectionPool: ConnectionError("No connection available.") from asyncio.TimeoutError.
+    # connect() cũng chạy trong timeout đó -> Redis treo / từ chối kết nối cũng ra lỗi này;
+    # chỉ coi là hết pool khi lúc gọi pool thật sự đã đầy
+    return (pool_was_full
+            and isinstance(error, RedisConnectionError)
+            and isinstance(error.__cause__, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through, consecutive failures are counted
+    open      -> calls fail immediately until `reset_timeout` has passed
+    half_open -> one probe call goes through; success closes, failure re-opens
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_started_at = now
+            return True
+
+        # half_open: chỉ 1 probe; nếu probe bị treo/huỷ quá lâu thì cho probe mới
+        if now - self._probe_started_at >= self.reset_timeout:
+            self._probe_started_at = now
+            return True
+        return False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("Redis circuit closed")
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning("Redis circuit opened after %s failures", self.failures)
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
 
 class AsyncRedisClient:
     """Async client để quản lý kết nối Redis"""
-    
+
     def __init__(self):
         """
-        Khởi tạo Async Redis client
-        
-        Args:
-            host: Redis host (mặc định: localhost)
-            port: Redis port (mặc định: 6379)
-            db: Redis database number (mặc định: 0)
-            decode_responses: Tự động decode responses thành string (mặc định: True)
+        Khởi tạo Async Redis client.
+        Một instance mỗi process: connection pool và circuit breaker được
+        dùng chung cho mọi caller, nên khi Redis down tất cả cùng fail nhanh.
         """
         self.host = setting.REDIS_HOST
         self.port = setting.REDIS_PORT
         self.db = setting.REDIS_DB
         self.decode_responses = setting.DECODE_RESPONSES
         self.client: Optional[redis.Redis] = None
-        
+        self.breaker = CircuitBreaker(
+            failure_threshold=setting.REDIS_BREAKER_FAILURES,
+            reset_timeout=setting.REDIS_BREAKER_RESET_SEC,
+        )
+
     async def connect(self) -> redis.Redis:
         """Tạo kết nối Redis async"""
         if self.client is None:
-            self.client = await redis.Redis(
+            pool = redis.BlockingConnectionPool(
                 host=self.host,
                 port=self.port,
                 db=self.db,
                 decode_responses=self.decode_responses,
-                socket_connect_timeout=5,
-                socket_timeout=5
+                max_connections=setting.REDIS_MAX_CONNECTIONS,
+                timeout=setting.REDIS_POOL_TIMEOUT_SEC,
+                socket_connect_timeout=setting.REDIS_CONNECT_TIMEOUT_SEC,
+                socket_timeout=setting.REDIS_SOCKET_TIMEOUT_SEC,
             )
+            self.client = redis.Redis(connection_pool=pool)
         return self.client
-    
+
+    async def warm_up(self, connections: int):
+        """Mở sẵn `connections` connection trong pool"""
+        client = await self.get_client()
+        pool = client.connection_pool
+        opened = []
+        try:
+            for _ in range(min(connections, setting.REDIS_MAX_CONNECTIONS)):
+                opened.append(await pool.get_connection("PING"))
+        finally:
+            for conn in opened:
+                await pool.release(conn)
+
     async def close(self):
         """Đóng kết nối Redis"""
         if self.client:
-            await self.client.close()
+            await self.client.close(close_connection_pool=True)
             self.client = None
-    
+
+    @property
+    def available(self) -> bool:
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    async def run(self, fn: Callable[[redis.Redis], Awaitable[T]]) -> T:
+        """
+        Run `fn(client)` through the circuit breaker.
+
+        Raises:
+            RedisUnavailableError: breaker is open or the call hit a connection error
+        """
+        if not self.breaker.allow():
+            raise RedisUnavailableError("Redis circuit is open")
+
+        client = await self.get_client()
+        pool_was_full = not client.connection_pool.can_get_connection()
+        # Tên caller làm label, vd. "UserCache.get" (qualname bỏ phần <locals>)
+        operation = getattr(fn, "__qualname__", "unknown").split(".<locals>", 1)[0]
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            result = await fn(client)
+        except CONNECTION_ERRORS as e:
+            if is_pool_timeout(e, pool_was_full):
+                # Pool bận (tải cao), không phải Redis lỗi -> không tính vào breaker,
+                # nếu không 1 đợt burst có thể tự mở circuit
+                outcome = "pool_timeout"
+                raise RedisPoolExhaustedError(str(e)) from e
+            self.breaker.record_failure()
+            outcome = "unavailable"
+            raise RedisUnavailableError(str(e)) from e
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            REDIS_CALL_SECONDS.labels(operation, outcome).observe(elapsed)
+            add_server_timing("redis", elapsed)
+        self.breaker.record_success()
+        return result
+
     async def ping(self) -> bool:
         """Kiểm tra kết nối Redis"""
         try:
-            if self.client is None:
-                await self.connect()
-            return await self.client.ping()
-        except redis.ConnectionError:
+            return await self.run(lambda client: client.ping())
+        except RedisUnavailableError:
             return False
-    
+
     async def get_client(self) -> redis.Redis:
         """Lấy Redis client instance"""
         if self.client is None:
             await self.connect()
         return self.client
-    
+
     async def __aenter__(self):
         """Context manager entry"""
         await self.connect()
         return self
-    
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit"""
         await self.close()
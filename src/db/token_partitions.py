@@ -0,0 +1,110 @@
+"""
+Optional daily RANGE partitioning of `user_tokens` by `expire_at`.
+
+Once partitioned, whole days of expired tokens are removed with
+DROP PARTITION (a metadata operation) instead of row-by-row deletes.
+Enabling it rebuilds the table, so run `python manage.py partition-tokens --enable`
+in a maintenance window (or through an online schema change tool).
+All functions take a sync Connection; from async code use `conn.run_sync`.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from typing import List, Tuple
+import logging
+
+from utils.datetime_utils import get_current_datetime
+
+logger = logging.getLogger(__name__)
+
+TABLE = "user_tokens"
+
+
+def _utc_today() -> date:
+    # expire_at được lưu theo UTC
+    return get_current_datetime().date()
+
+
+def _partition_name(day: date) -> str:
+    return f"p{day:%Y%m%d}"
+
+
+def _partition_clause(day: date) -> str:
+    # Partition pYYYYMMDD chứa token hết hạn trong ngày `day`
+    return f"PARTITION {_partition_name(day)} VALUES LESS THAN (TO_DAYS('{day + timedelta(days=1)}'))"
+
+
+def list_partitions(conn: Connection) -> List[Tuple[str, str]]:
+    """
+    Returns:
+        list: (partition_name, partition_description) ordered by position
+    """
+    rows = conn.execute(text("""
+        SELECT partition_name, partition_description
+        FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = :table AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+    """), {"table": TABLE}).all()
+    return [(row[0], row[1]) for row in rows]
+
+
+def is_partitioned(conn: Connection) -> bool:
+    return bool(list_partitions(conn))
+
+
+def enable_partitioning(conn: Connection, days_ahead: int):
+    if is_partitioned(conn):
+        logger.info("%s is already partitioned", TABLE)
+        return
+
+    today = _utc_today()
+    partitions = [_partition_clause(today + timedelta(days=i)) for i in range(days_ahead + 1)]
+    # Mọi unique key phải chứa cột partition -> PK thành (id, expire_at).
+    # p_old chứa toàn bộ dữ liệu cũ, sẽ bị drop khi hết hạn hết.
+    conn.execute(text(f"""
+        ALTER TABLE `{TABLE}`
+            DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `expire_at`)
+        PARTITION BY RANGE (TO_DAYS(`expire_at`)) (
+            PARTITION p_old VALUES LESS THAN (TO_DAYS('{today}')),
+            {", ".join(partitions)},
+            PARTITION pmax VALUES LESS THAN MAXVALUE
+        )
+    """))
+    logger.info("Partitioned %s by expire_at, %s days ahead", TABLE, days_ahead)
+
+
+def ensure_future_partitions(conn: Connection, days_ahead: int):
+    """
+    Split `pmax` so there is one partition per day up to today + days_ahead
+    """
+    today = _utc_today()
+    days = [datetime.strptime(name[1:], "%Y%m%d").date()
+            for name, _ in list_partitions(conn) if name not in ("p_old", "pmax")]
+    # Chỉ thêm các ngày sau partition mới nhất (range phải tăng dần)
+    last = max(days, default=today - timedelta(days=1))
+    missing = [last + timedelta(days=i) for i in range(1, (today + timedelta(days=days_ahead) - last).days + 1)]
+    if not missing:
+        return
+
+    # REORGANIZE pmax là thao tác nhanh vì pmax luôn rỗng
+    clauses = ", ".join(_partition_clause(day) for day in missing)
+    conn.execute(text(f"""
+        ALTER TABLE `{TABLE}` REORGANIZE PARTITION pmax INTO (
+            {clauses},
+            PARTITION pmax VALUES LESS THAN MAXVALUE
+        )
+    """))
+    logger.info("Added %s partitions to %s", len(missing), TABLE)
+
+
+def drop_expired_partitions(conn: Connection) -> List[str]:
+    """
+    Drop partitions whose rows have all expired (upper bound <= today)
+    """
+    today_days = conn.execute(text("SELECT TO_DAYS(UTC_DATE())")).scalar()
+    expired = [name for name, bound in list_partitions(conn)
+               if bound != "MAXVALUE" and int(bound) <= today_days]
+    if expired:
+        conn.execute(text(f"ALTER TABLE `{TABLE}` DROP PARTITION {', '.join(expired)}"))
+        logger.info("Dropped expired partitions of %s: %s", TABLE, expired)
+    return expired
@@ -0,0 +1,31 @@
+# middlewares/metrics.py
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from common.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS_TOTAL
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label theo route template (/api/v1/user/{user_id}) để không bùng nổ số series
+            route_path = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.labels(method, route_path).observe(time.perf_counter() - start)
+            HTTP_REQUESTS_TOTAL.labels(method, route_path, str(status_code)).inc()
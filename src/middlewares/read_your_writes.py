@@ -0,0 +1,38 @@
+# middlewares/read_your_writes.py
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from common.context import db_write_ctx
+from common.setting import get_settings
+from db.database import READ_YOUR_WRITES_COOKIE
+
+class ReadYourWritesMiddleware:
+    """
+    When a request wrote to the primary DB, tell the client (cookie) to read
+    from the primary for DB_READ_YOUR_WRITES_SEC, until replicas catch up.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.window = get_settings().DB_READ_YOUR_WRITES_SEC
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self.window <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"wrote": False}
+        token = db_write_ctx.set(state)
+
+        async def send_wrapper(message: Message):
+            # Ghi DB xảy ra trước khi response bắt đầu gửi
+            if message["type"] == "http.response.start" and state["wrote"]:
+                headers = MutableHeaders(scope=message)
+                headers.append("Set-Cookie",
+                               f"{READ_YOUR_WRITES_COOKIE}={time.time() + self.window}; "
+                               f"Max-Age={int(self.window) + 1}; Path=/; HttpOnly; SameSite=lax")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            db_write_ctx.reset(token)
@@ -0,0 +1,55 @@
+# middlewares/request_context.py
+import time
+import uuid
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from common.context import request_id_ctx, server_timing_ctx
+
+REQUEST_ID_HEADER = "X-Request-ID"
+MAX_REQUEST_ID_LENGTH = 128
+
+
+class RequestContextMiddleware:
+    """
+    Raw ASGI middleware (no BaseHTTPMiddleware task / body wrapping).
+
+    Sets `request_id_ctx` from X-Request-ID (generated only if missing), echoes
+    it back, and adds a Server-Timing header with the time spent in DB, Redis,
+    hashing and serialization, as accumulated by the hooks in `server_timing_ctx`.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:MAX_REQUEST_ID_LENGTH]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        start = time.perf_counter()
+        timings = {}
+        id_token = request_id_ctx.set(request_id)
+        timing_token = server_timing_ctx.set(timings)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers[REQUEST_ID_HEADER] = request_id
+                metrics = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+                metrics.append(f"total;dur={(time.perf_counter() - start) * 1000:.2f}")
+                headers.append("Server-Timing", ", ".join(metrics))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            server_timing_ctx.reset(timing_token)
+            request_id_ctx.reset(id_token)
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, String, DateTime, Enum, Text
+from sqlalchemy import Column, String, DateTime, Enum, Text, Index
 from sqlalchemy.sql import func
 import uuid
 from db.database import Base
 
 class User(Base):
     __tablename__ = 'users'
+    # Schema thay đổi qua migrations (src/db/migrations), giữ model khớp với đó
+    __table_args__ = (
+        Index('idx_users_created_id', 'created_at', 'id'),
+        Index('idx_users_status_created_id', 'status', 'created_at', 'id'),
+        Index('idx_users_last_login', 'last_login_at'),
+    )
 
     # Enum for user status
     class Status:
@@ -13,6 +19,10 @@ class User(Base):
         BANNED = 'banned'
         PENDING = 'pending'
 
+    class Role:
+        USER = 'user'
+        ADMIN = 'admin'
+
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     email = Column(String(255), unique=True, nullable=True)
     user_name = Column(String(255), nullable=True)
@@ -25,3 +35,9 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), nullable=False)
     updated_at = Column(DateTime(timezone=True), nullable=False)
     last_login_at = Column(DateTime(timezone=True), nullable=True)
+    role = Column(
+        Enum('user', 'admin'),
+        nullable=False,
+        default=Role.USER,
+        server_default=Role.USER
+    )
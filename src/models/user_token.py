@@ -1,10 +1,14 @@
-from sqlalchemy import Column, String, DateTime, Enum, Text
+from sqlalchemy import Column, String, DateTime, Enum, Text, Index
 import uuid
 from db.database import Base
 
     
 class UserToken(Base):
     __tablename__ = 'user_tokens'
+    # Schema thay đổi qua migrations (src/db/migrations), giữ model khớp với đó
+    __table_args__ = (
+        Index('idx_user_tokens_user_type_expire', 'user_id', 'token_type', 'expire_at'),
+    )
     class Status:
         ACCESS = 'access'
         REFRESH = 'refresh'
@@ -1,2 +1,5 @@
 from .user_repo import UserRepo
 from .user_token_repo import UserTokenRepo
+from .rate_limit_repo import RateLimitRepo
+from .token_revocation_repo import TokenRevocationRepo
+from .last_login_repo import LastLoginRepo
@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+from typing import Dict
+import logging
+
+from db.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Hash user_id -> last login (epoch ms) chờ ghi xuống MySQL
+PENDING_KEY = "last_login:pending"
+
+# Keep the newest timestamp per user. KEYS: pending hash, ARGV: user_id, ts_ms pairs.
+MERGE_MAX_LUA = """
+for i = 1, #ARGV, 2 do
+    local current = redis.call('HGET', KEYS[1], ARGV[i])
+    if not current or tonumber(current) < tonumber(ARGV[i + 1]) then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+return 0
+"""
+
+# Read and clear the pending hash atomically, so a login recorded meanwhile is never lost
+DRAIN_LUA = """
+local pending = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return pending
+"""
+
+
+def _to_ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+def _from_ms(value) -> datetime:
+    return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc)
+
+
+class LastLoginRepo:
+    """
+    Write-behind buffer of login timestamps, shared by all workers through Redis.
+    When Redis is unavailable, entries are kept in this worker's memory instead.
+    """
+    _merge_script = None
+    _drain_script = None
+    _local: Dict[str, datetime] = {}
+
+    @staticmethod
+    async def _scripts():
+        if LastLoginRepo._merge_script is None:
+            redis_client = await get_redis().get_client()
+            LastLoginRepo._merge_script = redis_client.register_script(MERGE_MAX_LUA)
+            LastLoginRepo._drain_script = redis_client.register_script(DRAIN_LUA)
+        return LastLoginRepo._merge_script, LastLoginRepo._drain_script
+
+    @staticmethod
+    def _merge_local(entries: Dict[str, datetime]):
+        for user_id, login_at in entries.items():
+            current = LastLoginRepo._local.get(user_id)
+            if current is None or current < login_at:
+                LastLoginRepo._local[user_id] = login_at
+
+    @staticmethod
+    async def push(entries: Dict[str, datetime]):
+        """
+        Record login timestamps; an older timestamp never replaces a newer one
+        """
+        if not entries:
+            return
+        args = []
+        for user_id, login_at in entries.items():
+            args += [user_id, _to_ms(login_at)]
+        try:
+            merge_script, _ = await LastLoginRepo._scripts()
+            await get_redis().run(lambda client: merge_script(keys=[PENDING_KEY], args=args, client=client))
+        except Exception as e:
+            logger.warning("Last login buffer write failed, keeping it locally: %s", e)
+            LastLoginRepo._merge_local(entries)
+
+    @staticmethod
+    async def drain() -> Dict[str, datetime]:
+        """
+        Take every pending timestamp (Redis and local) out of the buffer
+        """
+        entries, LastLoginRepo._local = LastLoginRepo._local, {}
+        try:
+            _, drain_script = await LastLoginRepo._scripts()
+            values = await get_redis().run(lambda client: drain_script(keys=[PENDING_KEY], client=client))
+        except Exception as e:
+            logger.warning("Last login buffer read failed: %s", e)
+            return entries
+
+        pending = {}
+        for user_id, ts_ms in zip(values[::2], values[1::2]):
+            if isinstance(user_id, bytes):
+                user_id = user_id.decode()
+            pending[user_id] = _from_ms(ts_ms)
+        for user_id, login_at in entries.items():
+            if user_id not in pending or pending[user_id] < login_at:
+                pending[user_id] = login_at
+        return pending
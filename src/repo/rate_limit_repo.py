@@ -0,0 +1,119 @@
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional
+import logging
+import secrets
+import threading
+import time
+
+from db.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Sliding-window log over several keys in one atomic call.
+# KEYS: window keys, ARGV: now_ms, window_ms, member, limit per key.
+# Returns 0 when the hit is recorded, otherwise the ms to wait.
+# Rejected hits are not recorded, so a flood cannot grow the sets past the limit.
+SLIDING_WINDOW_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local member = ARGV[3]
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local limit = tonumber(ARGV[3 + i])
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        local wait = window
+        if oldest[2] then
+            wait = tonumber(oldest[2]) + window - now
+        end
+        if wait > retry_after then
+            retry_after = wait
+        end
+    end
+end
+if retry_after > 0 then
+    return retry_after
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, member)
+    redis.call('PEXPIRE', key, window)
+end
+return 0
+"""
+
+
+class LocalRateLimiter:
+    """
+    In-process sliding-window log with the same semantics as SLIDING_WINDOW_LUA,
+    used while Redis is unavailable. Bounded to `max_keys` keys (LRU).
+    """
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[str, Deque[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, keys: List[str], limits: List[int], window_sec: int) -> int:
+        now_ms = int(time.time() * 1000)
+        window_ms = window_sec * 1000
+        retry_after = 0
+        with self._lock:
+            windows = []
+            for key, limit in zip(keys, limits):
+                window = self._windows.get(key)
+                if window is None:
+                    window = self._windows[key] = deque()
+                self._windows.move_to_end(key)
+                while window and window[0] <= now_ms - window_ms:
+                    window.popleft()
+                if len(window) >= limit:
+                    retry_after = max(retry_after, window[0] + window_ms - now_ms)
+                windows.append(window)
+
+            if retry_after == 0:
+                for window in windows:
+                    window.append(now_ms)
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        return retry_after
+
+
+class RateLimitRepo:
+    _script = None
+    _local: Optional[LocalRateLimiter] = None
+
+    @staticmethod
+    def hit_local(keys: List[str], limits: List[int], window_sec: int, max_keys: int) -> int:
+        """
+        Same as `hit`, counted in this process only
+        """
+        if RateLimitRepo._local is None:
+            RateLimitRepo._local = LocalRateLimiter(max_keys)
+        return RateLimitRepo._local.hit(keys, limits, window_sec)
+
+    @staticmethod
+    async def hit(keys: List[str], limits: List[int], window_sec: int) -> Optional[int]:
+        """
+        Record one hit on every key if all of them are under their limit.
+
+        Returns:
+            int: 0 if allowed, otherwise milliseconds until the next hit is allowed
+            None: Redis unavailable (caller decides to fail open)
+        """
+        try:
+            if RateLimitRepo._script is None:
+                redis_client = await get_redis().get_client()
+                # register_script uses EVALSHA and loads the script on NOSCRIPT
+                RateLimitRepo._script = redis_client.register_script(SLIDING_WINDOW_LUA)
+
+            now_ms = int(time.time() * 1000)
+            member = f"{now_ms}-{secrets.token_hex(4)}"
+            retry_after_ms = await get_redis().run(lambda client: RateLimitRepo._script(
+                keys=keys,
+                args=[now_ms, window_sec * 1000, member, *limits],
+                client=client,
+            ))
+            return int(retry_after_ms)
+        except Exception as e:
+            logger.error("Rate limit check failed: %s", e)
+            return None
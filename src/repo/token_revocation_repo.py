@@ -0,0 +1,215 @@
+from typing import Iterable, List, Optional, Set
+import asyncio
+import logging
+import time
+
+from common.setting import get_settings
+from db.redis_client import get_redis
+from utils.bloom_filter import BloomFilter
+
+logger = logging.getLogger(__name__)
+setting = get_settings()
+
+# Sorted set of explicitly revoked ids (families), score = expiry. Full filter rebuilds read it
+REVOKED_INDEX_KEY = "revoked_index"
+# Same ids, score = Redis server time of the revocation. Periodic syncs read only the new tail
+REVOKED_LOG_KEY = "revoked_log"
+
+# KEYS: revoked:<id>, index, log. ARGV: id, ttl, expire_at.
+# TIME của Redis làm score cho log: 1 đồng hồ chung cho mọi worker, thứ tự = thứ tự ghi
+REVOKE_LUA = """
+local now = redis.call('TIME')
+redis.call('SET', KEYS[1], 1, 'EX', ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+redis.call('ZADD', KEYS[3], now[1] + now[2] / 1000000, ARGV[1])
+return 1
+"""
+
+
+def revoked_key(token_id: str) -> str:
+    # token_id is a token `jti` or a refresh-token family `fam` (both uuid4)
+    return f"revoked:{token_id}"
+
+
+class TokenRevocationRepo:
+    """
+    Revoked ids live in Redis with TTL = remaining token lifetime.
+    Each worker keeps a Bloom filter of the explicitly revoked ids, so ids
+    that were never revoked are answered without a Redis round trip.
+    Used refresh-token jtis are not in the filter: `consume` is their check.
+    """
+    _revoke_script = None
+    _bloom: Optional[BloomFilter] = None
+    _bloom_count: int = 0
+    _bloom_synced_at: float = 0.0
+    _bloom_rebuilt_at: float = 0.0
+    # Score (Redis time) của entry mới nhất đã đọc từ REVOKED_LOG_KEY
+    _bloom_watermark: float = 0.0
+    # Id revoke trong worker này trong lúc đang rebuild ở thread, thêm vào filter mới trước khi swap
+    _pending_ids: Optional[List[str]] = None
+
+    @staticmethod
+    def _bloom_usable() -> bool:
+        # Filter chưa sync hoặc sync quá cũ -> luôn hỏi Redis
+        max_age = 3 * setting.REVOCATION_BLOOM_SYNC_SEC
+        return (TokenRevocationRepo._bloom is not None
+                and time.monotonic() - TokenRevocationRepo._bloom_synced_at < max_age)
+
+    @staticmethod
+    def maybe_revoked(token_id: str) -> bool:
+        if not TokenRevocationRepo._bloom_usable():
+            return True
+        return token_id in TokenRevocationRepo._bloom
+
+    @staticmethod
+    async def get_revoked(token_ids: List[str], unindexed_ids: Iterable[str] = ()) -> Optional[Set[str]]:
+        """
+        Return the subset of `token_ids` and `unindexed_ids` that are revoked, in at most
+        one Redis round trip. `unindexed_ids` (used refresh-token jtis) skip the Bloom filter.
+        Returns None when Redis is unavailable: callers must not treat the tokens as valid.
+        """
+        candidates = [i for i in token_ids if TokenRevocationRepo.maybe_revoked(i)]
+        candidates.extend(unindexed_ids)
+        if not candidates:
+            return set()
+        try:
+            values = await get_redis().run(
+                lambda client: client.mget([revoked_key(i) for i in candidates]))
+            return {i for i, value in zip(candidates, values) if value is not None}
+        except Exception as e:
+            logger.error("Revocation lookup failed: %s", e)
+            return None
+
+    @staticmethod
+    async def consume(jti: str, family: str, expire_at: int) -> Optional[str]:
+        """
+        Atomically mark a refresh token as used (revoked) and check its family.
+
+        Returns:
+            "ok": first use of the token, family still valid
+            "reused": token was already used before
+            "family_revoked": the token's family has been revoked
+            None: Redis unavailable
+        """
+        ttl = max(1, expire_at - int(time.time()))
+
+        async def _consume(client):
+            async with client.pipeline(transaction=True) as pipe:
+                # jti đã dùng không vào index: SET NX này chính là check reuse
+                pipe.set(revoked_key(jti), 1, ex=ttl, nx=True)
+                pipe.exists(revoked_key(family))
+                return await pipe.execute()
+
+        try:
+            newly_set, family_revoked = await get_redis().run(_consume)
+        except Exception as e:
+            logger.error("Refresh token consume failed: %s", e)
+            return None
+
+        if family_revoked:
+            return "family_revoked"
+        return "ok" if newly_set else "reused"
+
+    @staticmethod
+    async def revoke(token_id: str, expire_at: int) -> bool:
+        ttl = max(1, expire_at - int(time.time()))
+
+        try:
+            if TokenRevocationRepo._revoke_script is None:
+                redis_client = await get_redis().get_client()
+                TokenRevocationRepo._revoke_script = redis_client.register_script(REVOKE_LUA)
+
+            await get_redis().run(lambda client: TokenRevocationRepo._revoke_script(
+                keys=[revoked_key(token_id), REVOKED_INDEX_KEY, REVOKED_LOG_KEY],
+                args=[token_id, ttl, expire_at],
+                client=client,
+            ))
+        except Exception as e:
+            logger.error("Token revoke failed: %s", e)
+            return False
+
+        TokenRevocationRepo._add_local(token_id)
+        return True
+
+    @staticmethod
+    def _add_local(token_id: str):
+        if TokenRevocationRepo._pending_ids is not None:
+            TokenRevocationRepo._pending_ids.append(token_id)
+        if TokenRevocationRepo._bloom is not None:
+            TokenRevocationRepo._bloom.add(token_id)
+            TokenRevocationRepo._bloom_count += 1
+
+    @staticmethod
+    def _needs_rebuild() -> bool:
+        now = time.monotonic()
+        return (TokenRevocationRepo._bloom is None
+                # Filter đầy -> false positive tăng, dựng lại với capacity lớn hơn
+                or TokenRevocationRepo._bloom_count > setting.REVOCATION_BLOOM_CAPACITY
+                or now - TokenRevocationRepo._bloom_rebuilt_at >= setting.REVOCATION_BLOOM_REBUILD_SEC
+                # Mất sync lâu hơn thời gian giữ log -> có thể đã thiếu entry
+                or now - TokenRevocationRepo._bloom_synced_at >= setting.REVOCATION_BLOOM_REBUILD_SEC / 2)
+
+    @staticmethod
+    def _build_bloom(token_ids: List[str]) -> BloomFilter:
+        bloom = BloomFilter(max(setting.REVOCATION_BLOOM_CAPACITY, 2 * len(token_ids)),
+                            setting.REVOCATION_BLOOM_ERROR_RATE)
+        for token_id in token_ids:
+            bloom.add(token_id)
+        return bloom
+
+    @staticmethod
+    async def sync_bloom():
+        """
+        Add ids revoked since the last sync to the local Bloom filter.
+        The filter is rebuilt from the full index (in a thread) when missing, full or old.
+        """
+        if TokenRevocationRepo._needs_rebuild():
+            await TokenRevocationRepo._rebuild_bloom()
+            return
+
+        async def _load_new(client):
+            return await client.zrangebyscore(
+                REVOKED_LOG_KEY, TokenRevocationRepo._bloom_watermark, "+inf", withscores=True)
+
+        # Đọc cả entry có score = watermark: add lại vào filter không sao, không bỏ sót
+        entries = await get_redis().run(_load_new)
+        for token_id, score in entries:
+            TokenRevocationRepo._bloom.add(token_id)
+            TokenRevocationRepo._bloom_watermark = max(TokenRevocationRepo._bloom_watermark, score)
+        TokenRevocationRepo._bloom_count += len(entries)
+        TokenRevocationRepo._bloom_synced_at = time.monotonic()
+        if entries:
+            logger.debug("Revocation filter synced %s new ids", len(entries))
+
+    @staticmethod
+    async def _rebuild_bloom():
+        now = time.time()
+
+        async def _load(client):
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.zremrangebyscore(REVOKED_INDEX_KEY, "-inf", int(now))
+                pipe.zremrangebyscore(REVOKED_LOG_KEY, "-inf", now - setting.REVOCATION_BLOOM_REBUILD_SEC)
+                pipe.zrevrange(REVOKED_LOG_KEY, 0, 0, withscores=True)
+                pipe.zrange(REVOKED_INDEX_KEY, 0, -1)
+                return await pipe.execute()
+
+        _, _, latest, token_ids = await get_redis().run(_load)
+        watermark = latest[0][1] if latest else TokenRevocationRepo._bloom_watermark
+
+        # Hash cả index tốn CPU: làm ở thread, không block event loop
+        TokenRevocationRepo._pending_ids = []
+        try:
+            bloom = await asyncio.to_thread(TokenRevocationRepo._build_bloom, token_ids)
+            pending = TokenRevocationRepo._pending_ids
+        finally:
+            TokenRevocationRepo._pending_ids = None
+        for token_id in pending:
+            bloom.add(token_id)
+
+        synced_at = time.monotonic()
+        TokenRevocationRepo._bloom = bloom
+        TokenRevocationRepo._bloom_count = len(token_ids) + len(pending)
+        TokenRevocationRepo._bloom_watermark = watermark
+        TokenRevocationRepo._bloom_synced_at = synced_at
+        TokenRevocationRepo._bloom_rebuilt_at = synced_at
+        logger.debug("Revocation filter rebuilt with %s ids", len(token_ids))
@@ -0,0 +1,186 @@
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import json
+import logging
+
+from common.setting import get_settings
+from db.redis_client import get_redis
+from schemas import UserRead
+from utils.cache_utils import TTLCache
+from utils.task_utils import run_in_background
+
+logger = logging.getLogger(__name__)
+setting = get_settings()
+
+INVALIDATION_CHANNEL = "user_cache:invalidate"
+
+
+def id_key(user_id: str) -> str:
+    return f"user:id:{user_id}"
+
+def email_key(email: str) -> str:
+    return f"user:email:{email}"
+
+
+class UserCache:
+    """
+    Read-through cache of UserRead records, keyed by id and by email.
+
+    Tier 1 is a small per-worker TTL/LRU cache, tier 2 is Redis. Writes delete
+    the Redis keys and publish the keys on INVALIDATION_CHANNEL so every worker
+    drops its local copy. The short local TTL bounds staleness if a message is lost.
+    """
+    _local = TTLCache(maxsize=setting.USER_CACHE_LOCAL_SIZE, ttl=setting.USER_CACHE_LOCAL_TTL_SEC,
+                      name="user")
+
+    @staticmethod
+    async def get(key: str) -> Optional[UserRead]:
+        if not setting.USER_CACHE_ENABLED:
+            return None
+
+        user = UserCache._local.get(key)
+        if user is not None:
+            return user
+
+        try:
+            data = await get_redis().run(lambda client: client.get(key))
+        except Exception as e:
+            logger.warning("User cache read failed: %s", e)
+            return None
+        if data is None:
+            return None
+
+        user = UserRead.model_validate_json(data)
+        UserCache._local.set(key, user)
+        return user
+
+    @staticmethod
+    async def get_many_by_ids(user_ids: List[str]) -> Dict[str, UserRead]:
+        """
+        Local tier first, then one Redis MGET for the rest
+        """
+        if not setting.USER_CACHE_ENABLED:
+            return {}
+
+        found = {}
+        for user_id in user_ids:
+            user = UserCache._local.get(id_key(user_id))
+            if user is not None:
+                found[user_id] = user
+
+        missing = [i for i in user_ids if i not in found]
+        if not missing:
+            return found
+        try:
+            values = await get_redis().run(lambda client: client.mget([id_key(i) for i in missing]))
+        except Exception as e:
+            logger.warning("User cache read failed: %s", e)
+            return found
+
+        for user_id, data in zip(missing, values):
+            if data is not None:
+                user = UserRead.model_validate_json(data)
+                UserCache._local.set(id_key(user_id), user)
+                found[user_id] = user
+        return found
+
+    @staticmethod
+    async def set(user: UserRead):
+        await UserCache.set_many([user])
+
+    @staticmethod
+    async def set_many(users: List[UserRead]):
+        if not setting.USER_CACHE_ENABLED or not users:
+            return
+
+        entries = []
+        for user in users:
+            data = user.model_dump_json()
+            entries.append((id_key(user.id), user, data))
+            if user.email:
+                entries.append((email_key(user.email), user, data))
+        for key, user, _ in entries:
+            UserCache._local.set(key, user)
+
+        async def _set(client):
+            async with client.pipeline(transaction=False) as pipe:
+                for key, _, data in entries:
+                    pipe.set(key, data, ex=setting.USER_CACHE_REDIS_TTL_SEC)
+                return await pipe.execute()
+
+        try:
+            await get_redis().run(_set)
+        except Exception as e:
+            logger.warning("User cache write failed: %s", e)
+
+    @staticmethod
+    async def invalidate(user_ids: Iterable[str] = (), emails: Iterable[Optional[str]] = ()):
+        keys = [id_key(i) for i in user_ids] + [email_key(e) for e in emails if e]
+        if not keys:
+            return
+        UserCache._evict_local(keys)
+        if not setting.USER_CACHE_ENABLED:
+            return
+
+        await UserCache._invalidate_keys(keys)
+        if setting.DB_REPLICA_HOSTS:
+            # Read trên replica còn lag có thể cache lại bản cũ -> xoá lần 2 khi replica đã bắt kịp
+            run_in_background(UserCache._invalidate_later(keys), name="user-cache-invalidate-later")
+
+    @staticmethod
+    async def _invalidate_later(keys: List[str]):
+        await asyncio.sleep(setting.DB_READ_YOUR_WRITES_SEC)
+        UserCache._evict_local(keys)
+        await UserCache._invalidate_keys(keys)
+
+    @staticmethod
+    async def _invalidate_keys(keys: List[str]):
+        async def _invalidate(client):
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.delete(*keys)
+                pipe.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+                return await pipe.execute()
+
+        try:
+            await get_redis().run(_invalidate)
+        except Exception as e:
+            logger.error("User cache invalidation failed: %s", e)
+
+    @staticmethod
+    def local_stats() -> dict:
+        return UserCache._local.stats()
+
+    @staticmethod
+    def _evict_local(keys: Iterable[str]):
+        for key in keys:
+            UserCache._local.delete(key)
+
+    @staticmethod
+    async def listen_invalidations():
+        """
+        Long-running task: evict local entries invalidated by any worker
+        """
+        while True:
+            pubsub = None
+            try:
+                redis_client = await get_redis().get_client()
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Có thể đã lỡ message khi mất kết nối -> xoá hết tier local
+                UserCache._local.clear()
+
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message.get("type") == "message":
+                        UserCache._evict_local(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("User cache invalidation listener error: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
@@ -1,18 +1,54 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import select
-from typing import Optional
+from sqlalchemy import select, insert, update, tuple_, case, func
+from sqlalchemy.engine import Row
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
 import logging
 
 from models import User
-from schemas import UserCreate, UserRead, UserStatus, UserUpdate
+from repo.user_cache import UserCache, id_key, email_key
+from schemas import UserCreate, UserRead, UserStatus, UserUpdate, UserListFilter
 from utils.datetime_utils import get_current_datetime
 
 import uuid
 
 logger = logging.getLogger(__name__)
 
+# Index mà các query trong repo này cần (kiểm tra bằng `python manage.py check-indexes`)
+QUERY_INDEXES = [
+    ("users", ("id",), "UserRepo.get_by_id / update"),
+    ("users", ("email",), "UserRepo.get_by_email"),
+    ("users", ("created_at", "id"), "UserRepo.list_users / stream_users"),
+    ("users", ("status", "created_at", "id"), "UserRepo.list_users / stream_users (status filter)"),
+    ("users", ("last_login_at",), "UserRepo.list_users / stream_users (last_login filter)"),
+]
+
+# Cột trả về khi list user (không có password); select theo cột để không
+# giữ ORM object trong identity map khi stream cả bảng
+LIST_COLUMNS = (User.id, User.email, User.user_name, User.status,
+                User.created_at, User.updated_at, User.last_login_at)
+
+
+def _list_query(filters: UserListFilter, after: Optional[Tuple[datetime, str]] = None):
+    stmt = select(*LIST_COLUMNS)
+    if filters.status is not None:
+        stmt = stmt.where(User.status == filters.status.value)
+    if filters.created_from is not None:
+        stmt = stmt.where(User.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        stmt = stmt.where(User.created_at < filters.created_to)
+    if filters.last_login_from is not None:
+        stmt = stmt.where(User.last_login_at >= filters.last_login_from)
+    if filters.last_login_to is not None:
+        stmt = stmt.where(User.last_login_at < filters.last_login_to)
+    if after is not None:
+        # Keyset: tiếp tục sau (created_at, id) của dòng cuối trang trước, không OFFSET
+        stmt = stmt.where(tuple_(User.created_at, User.id) > tuple_(*after))
+    return stmt.order_by(User.created_at, User.id)
+
+
 class UserRepo:
     
     @staticmethod
@@ -32,13 +68,30 @@ class UserRepo:
             await db.flush()  # flush để bắt lỗi unique sớm
         except IntegrityError as e:
             await db.rollback()
-            logger.error(f'Error: {e}')
+            logger.error('Error: %s', e)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User could not be created due to DB constraint",
             )
+        await UserCache.invalidate([new_user.id], [new_user.email])
         return new_user
     
+    @staticmethod
+    async def bulk_create(db: Session, rows: List[dict]) -> None:
+        """
+        Insert many users with one multi-row INSERT (rows are column dicts)
+        """
+        if rows:
+            await db.execute(insert(User).values(rows))
+
+    @staticmethod
+    async def get_existing_emails(db: Session, emails: Iterable[str]) -> Set[str]:
+        emails = list(emails)
+        if not emails:
+            return set()
+        result = await db.execute(select(User.email).where(User.email.in_(emails)))
+        return set(result.scalars().all())
+
     @staticmethod
     async def get_by_id(db: Session, id: str) -> Optional[User]:
         stmt = select(User).where(User.id == id) 
@@ -46,6 +99,29 @@ class UserRepo:
         user = result.scalar_one_or_none() 
         return user if user else None
 
+    @staticmethod
+    async def get_many_by_ids(db: Session, ids: Iterable[str]) -> List[User]:
+        ids = list(ids)
+        if not ids:
+            return []
+        result = await db.execute(select(User).where(User.id.in_(ids)))
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def list_users(db: Session, filters: UserListFilter,
+                         after: Optional[Tuple[datetime, str]], limit: int) -> List[Row]:
+        result = await db.execute(_list_query(filters, after).limit(limit))
+        return list(result.all())
+
+    @staticmethod
+    async def stream_users(db: Session, filters: UserListFilter, chunk_size: int) -> AsyncIterator[Row]:
+        """
+        Yield every matching row from a server-side cursor, `chunk_size` rows per fetch
+        """
+        result = await db.stream(_list_query(filters).execution_options(yield_per=chunk_size))
+        async for row in result:
+            yield row
+
     @staticmethod
     async def get_by_email(db: Session, email: str) -> Optional[User]:
         stmt = select(User).where(User.email == email) 
@@ -54,27 +130,144 @@ class UserRepo:
         return user if user else None
 
     @staticmethod
-    async def update(db, id: str, user_update: UserUpdate) -> Optional[User]:
+    async def get_cached_by_id(db: Session, id: str) -> Optional[UserRead]:
+        """
+        Read-through: local cache -> Redis -> MySQL
+        """
+        user = await UserCache.get(id_key(id))
+        if user is None:
+            user_db = await UserRepo.get_by_id(db, id)
+            if user_db is None:
+                return None
+            user = UserRead.model_validate(user_db)
+            await UserCache.set(user)
+        return user
+
+    @staticmethod
+    async def get_cached_many(db: Session, ids: List[str]) -> Dict[str, UserRead]:
+        """
+        Resolve many ids: cache first, then one IN query for the misses
+        """
+        found = await UserCache.get_many_by_ids(ids)
+        missing = [i for i in ids if i not in found]
+        if missing:
+            users = [UserRead.model_validate(u) for u in await UserRepo.get_many_by_ids(db, missing)]
+            await UserCache.set_many(users)
+            found.update((u.id, u) for u in users)
+        return found
+
+    @staticmethod
+    async def get_cached_by_email(db: Session, email: str) -> Optional[UserRead]:
+        """
+        Read-through by email. Không chứa password, login vẫn phải dùng get_by_email
+        """
+        user = await UserCache.get(email_key(email))
+        if user is None:
+            user_db = await UserRepo.get_by_email(db, email)
+            if user_db is None:
+                return None
+            user = UserRead.model_validate(user_db)
+            await UserCache.set(user)
+        return user
+
+    @staticmethod
+    async def update(db, id: str, user_update: UserUpdate,
+                     expected_updated_at: Optional[datetime] = None,
+                     returning: bool = True) -> Optional[User]:
+        """
+        Partial update in a single `UPDATE ... WHERE id = :id` with the given
+        fields and `updated_at`, then commit.
+
+        Args:
+            expected_updated_at: optimistic concurrency, only update if the row
+                still has this `updated_at` (409 otherwise)
+            returning: return the updated row. Uses UPDATE ... RETURNING where
+                the server supports it, otherwise one SELECT by primary key
+
+        Returns:
+            User, or None if the user does not exist (or `returning` is False)
+        """
         # Convert Pydantic object thành dict, loại bỏ None values
         update_data = user_update.model_dump(exclude_none=True, exclude={'id'})
-        
+        if not update_data:
+            return await UserRepo.get_by_id(db, id) if returning else None
+
+        # Cache không chứa password -> chỉ đổi password thì không cần cả row, chỉ cần email
+        need_row = returning or bool(set(update_data) - {"password"})
+        stmt = update(User).where(User.id == id)
+        if expected_updated_at is not None:
+            stmt = stmt.where(User.updated_at == expected_updated_at)
+        stmt = stmt.values(**update_data, updated_at=get_current_datetime())
+
         try:
-            user = await UserRepo.get_by_id(db, id)
-            updated = False
-            for field, value in update_data.items():
-                setattr(user, field, value)
-                updated = True
-            
-            if updated:
-                user.updated_at = get_current_datetime()
-                await db.commit()
-                await db.refresh(user)
-            
-            return user
+            user = None
+            email = None
+            if db.bind.dialect.update_returning:
+                # Chỉ đổi password: không cần cả row, email đủ để xoá cache theo email
+                result = await db.execute(stmt.returning(User if need_row else User.email),
+                                          execution_options={"synchronize_session": False})
+                if need_row:
+                    user = result.scalar_one_or_none()
+                    matched = user is not None
+                else:
+                    row = result.first()
+                    matched = row is not None
+                    email = row.email if matched else None
+            else:
+                result = await db.execute(stmt, execution_options={"synchronize_session": False})
+                matched = result.rowcount > 0
+                if matched and need_row:
+                    user = await db.get(User, id, populate_existing=True)
+                elif matched:
+                    email = next(iter(await UserRepo.get_emails(db, [id])), None)
+
+            if not matched:
+                await db.rollback()
+                if expected_updated_at is not None and await UserRepo.get_by_id(db, id) is not None:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="User was modified concurrently",
+                    )
+                return None
+
+            await db.commit()
+        except HTTPException:
+            raise
         except Exception as e:
             await db.rollback()
-            logger.error(f'ERROR: {e}')
+            logger.error('ERROR: %s', e)
             raise e
-    
+
+        # Sau commit mới invalidate, tránh worker khác cache lại bản cũ. Đổi password cũng
+        # đổi updated_at trong cache -> luôn xoá, kể cả khi không lấy row
+        await UserCache.invalidate([id], [user.email if user is not None else email])
+        return user if returning else None
+
+    @staticmethod
+    async def set_last_login_many(db, last_logins: Dict[str, datetime]) -> int:
+        """
+        Write many last_login_at values in one UPDATE (no SELECT, no refresh).
+        A value older than the stored one is ignored. The caller commits.
+
+        Returns:
+            int: number of rows changed
+        """
+        if not last_logins:
+            return 0
+        new_value = case(last_logins, value=User.id)
+        stmt = (
+            update(User)
+            .where(User.id.in_(list(last_logins)))
+            .values(last_login_at=func.greatest(func.coalesce(User.last_login_at, new_value), new_value))
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        return result.rowcount
+
+    @staticmethod
+    async def get_emails(db, ids: Iterable[str]) -> List[Optional[str]]:
+        result = await db.execute(select(User.email).where(User.id.in_(list(ids))))
+        return list(result.scalars().all())
+
     def delete(self, id: str) -> None:
         pass
\ No newline at end of file
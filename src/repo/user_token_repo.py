@@ -5,7 +5,6 @@ from sqlalchemy import select, and_, delete, desc
 from typing import Optional
 import logging
 import datetime
-import json
 
 from common.setting import get_settings
 from db.redis_client import get_redis
@@ -16,14 +15,33 @@ from utils.datetime_utils import get_current_datetime
 
 logger = logging.getLogger(__name__)
 setting = get_settings()
-redis_cache = get_redis()
+
+# Index mà các query trong repo này cần (kiểm tra bằng `python manage.py check-indexes`)
+QUERY_INDEXES = [
+    ("user_tokens", ("user_id", "token_type", "expire_at"), "UserTokenRepo.consume_token / delete"),
+    ("user_tokens", ("expire_at",), "UserTokenRepo.delete_expired_batch"),
+]
+
+# Compare-and-delete: chỉ xoá key khi giá trị đúng bằng token gửi lên
+CONSUME_TOKEN_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def confirm_token_key(user_id: str) -> str:
+    return f"token_{TokenType.confirm.value}:{user_id}"
+
 
 class UserTokenRepo:
+    _consume_script = None
     
     @staticmethod
     async def create(db: Session, user_token: UserTokenBase) -> UserToken:
         created_at = get_current_datetime()
-        expire_at = created_at + datetime.timedelta(minutes=setting.TOKEN_TTL_SEC)
+        expire_at = created_at + datetime.timedelta(seconds=setting.TOKEN_TTL_SEC)
         new_token = UserToken(
             user_id=user_token.user_id,
             token_type=user_token.token_type,
@@ -37,7 +55,7 @@ class UserTokenRepo:
             await db.flush()  # flush để bắt lỗi unique sớm
         except IntegrityError as e:
             await db.rollback()
-            logger.error(f'Error: {e}')
+            logger.error('Error: %s', e)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User could not be created due to DB constraint",
@@ -47,20 +65,45 @@ class UserTokenRepo:
 
     
     @staticmethod
-    async def verify_token(db: Session, user_id: str, token: str, token_type: TokenType) -> Optional[UserToken]:
-        stmt = (select(UserToken).where(
-                and_(UserToken.user_id == user_id,
-                     UserToken.token == token,
-                     UserToken.token_type == token_type,
-                     UserToken.expire_at >= get_current_datetime()
-                     )).order_by(desc(UserToken.expire_at)))
+    async def consume_token(db: Session, user_id: str, token: str, token_type: TokenType,
+                            check_expiry: bool = True) -> bool:
+        """
+        Atomically delete a matching (and unexpired) token in one DELETE.
+        Of two concurrent consumes only one sees rowcount > 0.
+        Does not commit: the caller commits it together with its own changes.
+
+        Returns:
+            bool: True if a token was consumed
+        """
+        conditions = [UserToken.user_id == user_id,
+                      UserToken.token == token,
+                      UserToken.token_type == token_type]
+        if check_expiry:
+            conditions.append(UserToken.expire_at >= get_current_datetime())
+        try:
+            result = await db.execute(delete(UserToken).where(and_(*conditions)))
+            return result.rowcount > 0
+        except Exception as e:
+            await db.rollback()
+            logger.error('ERROR: %s', e)
+            raise e
+
+    @staticmethod
+    async def delete_expired_batch(db: Session, before: datetime.datetime, limit: int) -> int:
+        """
+        Delete at most `limit` tokens expired before `before` and commit,
+        so each batch only holds row locks briefly.
+        """
+        stmt = (delete(UserToken)
+                .where(UserToken.expire_at < before)
+                .with_dialect_options(mysql_limit=limit))
         try:
             result = await db.execute(stmt)
-            token_obj = result.scalar_one_or_none()
-            if token_obj:
-                await UserTokenRepo.delete(db, user_id, token, TokenType.confirm)
-                return token_obj
+            await db.commit()
+            return result.rowcount
         except Exception as e:
+            await db.rollback()
+            logger.error('ERROR: %s', e)
             raise e
 
     @staticmethod
@@ -79,113 +122,59 @@ class UserTokenRepo:
             return True
         except Exception as e:
             db.rollback()
-            logger.error(f'ERROR: {e}')
+            logger.error('ERROR: %s', e)
             raise e
 
     @staticmethod
     async def push_token_redis(user_id: str, token: str) -> bool:
         """
-        Push token vào Redis với user_id làm key (async)
+        Push token vào Redis với user_id làm key (async), 1 lệnh SET ... EX
         
         Args:
             user_id: ID của user
             token: Token cần cache
-            metadata: Thông tin bổ sung (optional)
         
         Returns:
             bool: True nếu thành công, False nếu thất bại
         """
         try:
-            # Kiểm tra kết nối
-            if not await redis_cache.ping():
-                logger.info("❌ Không thể kết nối đến Redis!")
-                return False
-            
-            logger.info("✅ Đã kết nối Redis thành công!")
-            
-            # Chuẩn bị data để lưu
-            cache_data = {
-                "token": token,
-                "user_id": user_id,
-                "created_at": get_current_datetime().isoformat(),
-            }
-            
-            # Tạo key cho Redis
-            redis_key = f"token_{TokenType.confirm.value}:{user_id}"
-            
-            # Lưu vào Redis với TTL
-            redis_client = await redis_cache.get_client()
-            await redis_client.setex(
-                redis_key,
-                setting.TOKEN_TTL_SEC,
-                json.dumps(cache_data)
-            )
-            
-            # Kiểm tra TTL
-            ttl = await redis_client.ttl(redis_key)
-            
-            logger.info(f"✅ Đã lưu token cho user_id: {user_id}")
-            logger.info(f"   Key: {redis_key}")
-            logger.info(f"   TTL: {ttl} giây (~{ttl//60} phút)")
-            logger.info(f"   Token: {token[:20]}..." if len(token) > 20 else f"   Token: {token}")
-            
+            redis_key = confirm_token_key(user_id)
+            await get_redis().run(lambda client: client.set(redis_key, token, ex=setting.TOKEN_TTL_SEC))
+            logger.debug("Pushed confirm token for user_id %s, TTL %s s", user_id, setting.TOKEN_TTL_SEC)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Lỗi khi push token: {str(e)}")
+            logger.error("Push confirm token failed: %s", e)
             return False
         
     @staticmethod
-    async def verify_token_redis(user_id: str) -> bool:
+    async def verify_token_redis(user_id: str, token: str) -> Optional[bool]:
         """
-        Lấy token từ Redis theo user_id (async)
+        So sánh và xoá token trong Redis bằng 1 lệnh atomic (async).
+        Hai request confirm đồng thời với cùng token thì chỉ 1 request thành công.
         
         Args:
             user_id: ID của user
+            token: Token user gửi lên
         
         Returns:
-            dict: Thông tin token hoặc None nếu không tìm thấy
+            True: token đúng và đã được consume
+            False: không có token hoặc token sai
+            None: Redis không khả dụng
         """
         try:
-            # Kiểm tra kết nối
-            if not await redis_cache.ping():
-                logger.info("❌ Không thể kết nối đến Redis!")
-                return None
-            
-            logger.info("✅ Đã kết nối Redis thành công!")
-            
-            # Tạo key cho Redis
-            redis_key = f"token_{TokenType.confirm.value}:{user_id}"
-            
-            # Lấy data từ Redis
-            redis_client = await redis_cache.get_client()
-            cached_data = await redis_client.get(redis_key)
-            
-            if not cached_data:
-                logger.info(f"❌ Không tìm thấy token cho user_id: {user_id}")
-                logger.info(f"   Key: {redis_key}")
-                logger.info(f"   (Token có thể đã hết hạn hoặc chưa được tạo)")
-                return None
-            
-            # Parse JSON
-            token_data = json.loads(cached_data)
-            
-            # Lấy TTL còn lại
-            ttl = await redis_client.ttl(redis_key)
-            
-            logger.info(f"✅ Đã tìm thấy token cho user_id: {user_id}")
-            logger.info(f"   Key: {redis_key}")
-            logger.info(f"   TTL còn lại: {ttl} giây (~{ttl//60} phút {ttl%60} giây)")
-            logger.info(f"   Token: {token_data['token'][:30]}..." if len(token_data['token']) > 30 else f"   Token: {token_data['token']}")
-            logger.info(f"   Created at: {token_data['created_at']}")
-            
-            await redis_client.delete(redis_key)
-            
-            return True
+            if UserTokenRepo._consume_script is None:
+                redis_client = await get_redis().get_client()
+                # register_script dùng EVALSHA, tự load lại script khi gặp NOSCRIPT
+                UserTokenRepo._consume_script = redis_client.register_script(CONSUME_TOKEN_LUA)
+
+            redis_key = confirm_token_key(user_id)
+            consumed = await get_redis().run(lambda client: UserTokenRepo._consume_script(
+                keys=[redis_key], args=[token], client=client))
+            if not consumed:
+                logger.debug("Confirm token not found or mismatched in Redis for user_id %s", user_id)
+            return bool(consumed)
             
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ Lỗi khi parse JSON: {str(e)}")
-            return None
         except Exception as e:
-            logger.error(f"❌ Lỗi khi get token: {str(e)}")
+            logger.error("Consume confirm token failed: %s", e)
             return None
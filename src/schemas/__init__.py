@@ -1,3 +1,7 @@
 from .api_response import ApiResponse
-from .user import UserCreate, UserRead, UserUpdate, UserStatus
-from .auth import LoginRequest, LoginResponse, RegisterReponse, TokenType, UserTokenBase, RefreshTokenResponse
\ No newline at end of file
+from .user import (UserCreate, UserRead, UserUpdate, UserStatus,
+                   UserImportRow, UserImportError, UserImportResult,
+                   UserBatchRequest, UserBatchItem, UserBatchResponse,
+                   UserListFilter, UserListResponse)
+from .auth import (LoginRequest, LoginResponse, RegisterReponse, TokenType, UserTokenBase, RefreshTokenResponse,
+                   RefreshRequest, IntrospectRequest, TokenIntrospection, IntrospectResponse)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 from datetime import datetime
 
@@ -18,6 +18,9 @@ class LoginResponse(BaseModel):
 class RegisterReponse(UserRead):
     confirm_token: str
     
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class RefreshTokenResponse(BaseModel):
     confirm_token: str
 
@@ -31,4 +34,16 @@ class UserTokenBase(BaseModel):
     token_type: Optional[TokenType]
     token: Optional[str]
     created_at: Optional[datetime] = None
-    expire_at: Optional[datetime] = None
\ No newline at end of file
+    expire_at: Optional[datetime] = None
+
+class IntrospectRequest(BaseModel):
+    tokens: List[str]
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    token_type: Optional[TokenType] = None
+    claims: Optional[dict] = None
+    expires_in: Optional[int] = None
+
+class IntrospectResponse(BaseModel):
+    results: List[TokenIntrospection]
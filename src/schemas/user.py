@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 import uuid
@@ -13,6 +13,12 @@ class UserStatus(str, Enum):
     pending = "pending"
 
 
+# Enum cho role (claim `role` trong JWT)
+class UserRole(str, Enum):
+    user = "user"
+    admin = "admin"
+
+
 # Base model (common)
 class UserBase(BaseModel):
     email: Optional[EmailStr] = None
@@ -54,3 +60,53 @@ class UserUpdate(BaseModel):
     id: str
     status: Optional[UserStatus] = None
     last_login_at: Optional[datetime] = None
+    password: Optional[str] = None
+
+
+# Một dòng khi import user hàng loạt (password hoặc password_hash Argon2 có sẵn)
+class UserImportRow(BaseModel):
+    email: EmailStr
+    user_name: Optional[str] = None
+    password: Optional[str] = None
+    password_hash: Optional[str] = None
+    status: UserStatus = UserStatus.pending
+
+
+class UserImportError(BaseModel):
+    line: int
+    email: Optional[str] = None
+    error: str
+
+
+class UserImportResult(BaseModel):
+    total: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: List[UserImportError] = []
+
+
+class UserBatchRequest(BaseModel):
+    ids: List[str]
+
+
+class UserBatchItem(BaseModel):
+    id: str
+    found: bool
+    user: Optional[UserRead] = None
+
+
+class UserBatchResponse(BaseModel):
+    items: List[UserBatchItem]
+
+
+class UserListFilter(BaseModel):
+    status: Optional[UserStatus] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    last_login_from: Optional[datetime] = None
+    last_login_to: Optional[datetime] = None
+
+
+class UserListResponse(BaseModel):
+    items: List[UserRead]
+    next_cursor: Optional[str] = None
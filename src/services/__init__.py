@@ -1,2 +1,4 @@
+from .rate_limit_service import RateLimitService
 from .user_service import UserService
-from .auth_service import AuthService
\ No newline at end of file
+from .auth_service import AuthService
+from .last_login_service import LastLoginService
@@ -1,21 +1,33 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from typing import List, Optional
 import logging
+import time
 
 from schemas import (LoginRequest, LoginResponse, UserUpdate, 
                      TokenType, UserStatus, UserRead,
-                     UserTokenBase, RefreshTokenResponse)
-from repo import UserRepo, UserTokenRepo
-from utils.hash_utils import verify_password
-from utils.jwt_utils import create_jwt_token, verify_jwt_token
+                     UserTokenBase, RefreshTokenResponse,
+                     TokenIntrospection, IntrospectResponse)
+from common.setting import get_settings
+from db.database import get_database
+from repo import UserRepo, UserTokenRepo, TokenRevocationRepo
+from services.rate_limit_service import RateLimitService
+from services.last_login_service import LastLoginService
+from utils.hash_utils import verify_password_async, hash_password_async, needs_rehash
+from utils.task_utils import run_in_background
+from utils.jwt_utils import create_jwt_token, verify_jwt_token_cached
 from utils.datetime_utils import get_current_datetime
 from utils.utils import generate_confirm_token
 
 logger = logging.getLogger(__name__)
+setting = get_settings()
 
 class AuthService:
     @staticmethod
-    async def login(db: Session, user_in: LoginRequest) -> LoginResponse:
+    async def login(db: Session, user_in: LoginRequest, client_ip: Optional[str] = None) -> LoginResponse:
+        # Chặn brute-force trước khi tốn CPU cho Argon2
+        await RateLimitService.check_login(user_in.email, client_ip)
+
         # Check email tồn tại chưa
         user = await UserRepo.get_by_email(db, user_in.email)
         if not user:
@@ -25,18 +37,23 @@ class AuthService:
             )
 
         # Verify password
-        if verify_password(password=user_in.password, hash_str=user.password) == False:
+        if not await verify_password_async(password=user_in.password, hash_str=user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Email or password not correct",
             )
+
+        # Hash cũ (tham số Argon2 đã đổi) -> hash lại ở background
+        if needs_rehash(user.password):
+            run_in_background(AuthService.rehash_password(user.id, user_in.password),
+                              name=f"rehash-{user.id}")
         
         # Tạo JWT token
         user_data  = {
                         "user_id": user.id,
                         "email": user.email, 
                         "name": user.user_name,
-                        "role": "user"
+                        "role": user.role
                     }
         access_token, exp, refresh_token = create_jwt_token(user_data)
         
@@ -47,26 +64,48 @@ class AuthService:
             token_type="Bearer"
         )
         
-        # Update last login
-        await UserRepo.update(db, user.id, UserUpdate(id=user.id, last_login_at=get_current_datetime()))
+        # Update last login (write-behind, không ghi MySQL trên đường login)
+        await LastLoginService.record(user.id, get_current_datetime())
         return response
 
 
+    @staticmethod
+    async def rehash_password(user_id: str, password: str) -> None:
+        """
+        Re-hash a verified password with the current Argon2 parameters.
+        Runs after the login response, with its own DB session.
+        """
+        new_hash = await hash_password_async(password)
+        async with get_database().async_session() as db:
+            await UserRepo.update(db, user_id, UserUpdate(id=user_id, password=new_hash), returning=False)
+        logger.info("Rehashed password of user %s with current Argon2 parameters", user_id)
+
+
     @staticmethod
     async def confirm_user(db: Session, user_id: str, token: str) -> UserRead:
         
-        check_redis = await UserTokenRepo.verify_token_redis(user_id=user_id)
-        if not check_redis:
-            # Verify password
-            token_db = await UserTokenRepo.verify_token(db, user_id, token, TokenType.confirm)
-            
-            if not token_db:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Token is Invalid",
-                )
-        
+        check_redis = await UserTokenRepo.verify_token_redis(user_id=user_id, token=token)
+        if check_redis:
+            # Xoá bản DB để token không dùng lại được qua nhánh fallback
+            await UserTokenRepo.consume_token(db, user_id, token, TokenType.confirm, check_expiry=False)
+            valid = True
+        else:
+            # Redis down, key hết hạn / bị evict / push lỗi -> consume trên DB (1 DELETE atomic,
+            # check rowcount) nên vẫn chỉ dùng được 1 lần
+            valid = await UserTokenRepo.consume_token(db, user_id, token, TokenType.confirm)
+
+        if not valid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Token is Invalid",
+            )
+
         user = await UserRepo.update(db, id=user_id, user_update=UserUpdate(id=user_id, status=UserStatus.active))
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found",
+            )
         user_rs = UserRead.model_validate(user)
         
         return user_rs
@@ -91,4 +130,138 @@ class AuthService:
         confirm_token = await UserTokenRepo.create(db, user_token)
         await UserTokenRepo.push_token_redis(user_id, confirm_token.token)
         
-        return RefreshTokenResponse(confirm_token=confirm_token.token)
\ No newline at end of file
+        return RefreshTokenResponse(confirm_token=confirm_token.token)
+
+
+    @staticmethod
+    async def introspect(tokens: List[str]) -> IntrospectResponse:
+        if len(tokens) > setting.INTROSPECT_MAX_TOKENS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {setting.INTROSPECT_MAX_TOKENS} tokens per request",
+            )
+
+        payloads = [verify_jwt_token_cached(token) for token in tokens]
+
+        # Check revocation cho cả batch trong 1 lần gọi Redis. jti của refresh token đã
+        # dùng không có trong Bloom filter -> luôn hỏi Redis
+        token_ids, used_ids = [], []
+        for payload in filter(None, payloads):
+            if "fam" in payload:
+                token_ids.append(payload["fam"])
+            if "jti" in payload:
+                is_refresh = payload.get("type") == TokenType.refresh.value
+                (used_ids if is_refresh else token_ids).append(payload["jti"])
+        revoked = await TokenRevocationRepo.get_revoked(token_ids, used_ids)
+        if revoked is None:
+            # Không biết token nào đã bị revoke -> không được trả active
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Token store unavailable, please retry later",
+            )
+
+        now = int(time.time())
+        results = []
+        for payload in payloads:
+            if not payload or any(i in revoked for i in AuthService._revocation_ids(payload)):
+                results.append(TokenIntrospection(active=False))
+                continue
+
+            is_refresh = payload.get("type") == TokenType.refresh.value
+            results.append(TokenIntrospection(
+                active=True,
+                token_type=TokenType.refresh if is_refresh else TokenType.access,
+                claims=payload,
+                expires_in=max(0, payload["exp"] - now) if "exp" in payload else None,
+            ))
+
+        return IntrospectResponse(results=results)
+
+    @staticmethod
+    def _revocation_ids(payload: dict) -> List[str]:
+        return [payload[k] for k in ("jti", "fam") if k in payload]
+
+    @staticmethod
+    def _verify_refresh_token(refresh_token: str) -> dict:
+        payload = verify_jwt_token_cached(refresh_token)
+        if (not payload or payload.get("type") != TokenType.refresh.value
+                or "jti" not in payload or "fam" not in payload):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Refresh token is invalid or expired",
+            )
+        return payload
+
+    @staticmethod
+    async def refresh(db: Session, refresh_token: str) -> LoginResponse:
+        payload = AuthService._verify_refresh_token(refresh_token)
+
+        # Bloom filter trả lời phần lớn family hợp lệ mà không cần gọi Redis;
+        # jti đã dùng do consume bên dưới phát hiện (và huỷ cả family)
+        revoked = await TokenRevocationRepo.get_revoked([payload["fam"]])
+        if revoked is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Token store unavailable, please retry later",
+            )
+        if revoked:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Refresh token has been revoked",
+            )
+
+        # Rotate: đánh dấu token cũ đã dùng (atomic), phát hiện reuse
+        result = await TokenRevocationRepo.consume(payload["jti"], payload["fam"], payload["exp"])
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Token store unavailable, please retry later",
+            )
+        if result == "reused":
+            # Token đã dùng rồi mà lại được gửi lên -> có thể bị đánh cắp, huỷ cả family
+            logger.warning("Refresh token reuse detected for user %s, revoking family %s",
+                           payload["user_id"], payload["fam"])
+            await TokenRevocationRepo.revoke(payload["fam"], AuthService._family_expire_at())
+        if result != "ok":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Refresh token has been revoked",
+            )
+
+        user = await UserRepo.get_by_id(db, payload["user_id"])
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Refresh token is invalid or expired",
+            )
+
+        user_data = {
+            "user_id": user.id,
+            "email": user.email,
+            "name": user.user_name,
+            "role": user.role
+        }
+        access_token, exp, new_refresh_token = create_jwt_token(user_data, family=payload["fam"])
+        return LoginResponse(
+            access_token=access_token,
+            refresh_token=new_refresh_token,
+            expires_in=exp,
+            token_type="Bearer"
+        )
+
+    @staticmethod
+    async def revoke(refresh_token: str) -> None:
+        """
+        Revoke the whole family of a refresh token (logout)
+        """
+        payload = AuthService._verify_refresh_token(refresh_token)
+        if not await TokenRevocationRepo.revoke(payload["fam"], AuthService._family_expire_at()):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Token store unavailable, please retry later",
+            )
+
+    @staticmethod
+    def _family_expire_at() -> int:
+        # Token mới nhất của family sống tối đa REFRESH_TOKEN_EXPIRES_DAY kể từ bây giờ
+        return int(time.time()) + setting.REFRESH_TOKEN_EXPIRES_DAY * 24 * 3600
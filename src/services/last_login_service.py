@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import Optional
+import logging
+
+from common.setting import get_settings
+from db.database import MysqlDatabase, get_database
+from repo import UserRepo, LastLoginRepo
+from repo.user_cache import UserCache
+
+logger = logging.getLogger(__name__)
+setting = get_settings()
+
+
+class LastLoginService:
+    @staticmethod
+    async def record(user_id: str, login_at: datetime):
+        """
+        Buffer a login timestamp; it reaches MySQL on the next flush
+        """
+        await LastLoginRepo.push({user_id: login_at})
+
+    @staticmethod
+    async def flush(database: Optional[MysqlDatabase] = None,
+                    batch_size: int = setting.LAST_LOGIN_FLUSH_BATCH) -> int:
+        """
+        Write every buffered timestamp with one UPDATE per `batch_size` users.
+        Entries of a failed batch go back to the buffer for the next flush.
+
+        Returns:
+            int: number of users written
+        """
+        pending = await LastLoginRepo.drain()
+        if not pending:
+            return 0
+
+        database = database or get_database()
+        items = sorted(pending.items())  # cùng thứ tự khoá giữa các worker, tránh deadlock
+        total = 0
+        for start in range(0, len(items), batch_size):
+            chunk = dict(items[start:start + batch_size])
+            try:
+                async with database.async_session() as db:
+                    await UserRepo.set_last_login_many(db, chunk)
+                    await db.commit()
+                    emails = await UserRepo.get_emails(db, chunk)
+            except Exception as e:
+                logger.error("Last login flush failed for %s users: %s", len(chunk), e)
+                await LastLoginRepo.push(chunk)
+                continue
+            await UserCache.invalidate(chunk, emails)
+            total += len(chunk)
+
+        logger.debug("Flushed last_login_at of %s users", total)
+        return total
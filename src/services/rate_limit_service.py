@@ -0,0 +1,43 @@
+from fastapi import HTTPException, status
+from typing import Optional
+import logging
+import math
+
+from common.setting import get_settings
+from repo import RateLimitRepo
+
+logger = logging.getLogger(__name__)
+setting = get_settings()
+
+
+class RateLimitService:
+    @staticmethod
+    async def check_login(email: str, client_ip: Optional[str]) -> None:
+        """
+        Throttle login attempts per email and per client IP before any
+        password verify runs. Raises 429 with Retry-After when over the limit.
+        """
+        if not setting.LOGIN_RATE_LIMIT_ENABLED:
+            return
+
+        keys = [f"ratelimit:login:email:{email.lower()}"]
+        limits = [setting.LOGIN_RATE_LIMIT_PER_EMAIL]
+        if client_ip:
+            keys.append(f"ratelimit:login:ip:{client_ip}")
+            limits.append(setting.LOGIN_RATE_LIMIT_PER_IP)
+
+        retry_after_ms = await RateLimitRepo.hit(keys, limits, setting.LOGIN_RATE_WINDOW_SEC)
+        if retry_after_ms is None:
+            # Redis không khả dụng -> giới hạn trong process, chia đều hạn mức cho các worker
+            workers = max(1, setting.WORKERS)
+            retry_after_ms = RateLimitRepo.hit_local(
+                keys, [max(1, limit // workers) for limit in limits],
+                setting.LOGIN_RATE_WINDOW_SEC, setting.LOGIN_RATE_LOCAL_MAX_KEYS)
+
+        if retry_after_ms > 0:
+            logger.warning("Login throttled for %s from %s", email, client_ip)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, please retry later",
+                headers={"Retry-After": str(math.ceil(retry_after_ms / 1000))},
+            )
@@ -0,0 +1,63 @@
+from sqlalchemy import text
+from typing import Optional
+import asyncio
+import logging
+
+from common.setting import get_settings
+from db import token_partitions
+from db.database import MysqlDatabase, get_database
+from repo import UserTokenRepo
+from utils.datetime_utils import get_current_datetime
+
+logger = logging.getLogger(__name__)
+setting = get_settings()
+
+# Chỉ 1 worker/process dọn bảng tại một thời điểm
+REAPER_LOCK_NAME = "auth_service_user_tokens_reaper"
+
+
+class TokenReaperService:
+    @staticmethod
+    async def reap(database: Optional[MysqlDatabase] = None,
+                   batch_size: int = setting.TOKEN_REAPER_BATCH_SIZE,
+                   pause_sec: float = setting.TOKEN_REAPER_PAUSE_SEC,
+                   max_batches: int = setting.TOKEN_REAPER_MAX_BATCHES) -> int:
+        """
+        Delete expired user_tokens in small committed batches with a pause
+        between them. If the table is partitioned, fully expired partitions
+        are dropped first and upcoming ones are created.
+
+        Returns:
+            int: number of rows deleted
+        """
+        database = database or get_database()
+        total = 0
+
+        async with database.async_engine.connect() as lock_conn:
+            got_lock = (await lock_conn.execute(text("SELECT GET_LOCK(:name, 0)"),
+                                                {"name": REAPER_LOCK_NAME})).scalar()
+            if got_lock != 1:
+                logger.debug("Token reaper already running elsewhere")
+                return 0
+
+            try:
+                if await lock_conn.run_sync(token_partitions.is_partitioned):
+                    await lock_conn.run_sync(token_partitions.ensure_future_partitions,
+                                             setting.TOKEN_PARTITION_DAYS_AHEAD)
+                    await lock_conn.run_sync(token_partitions.drop_expired_partitions)
+
+                now = get_current_datetime()
+                for _ in range(max_batches):
+                    async with database.async_session() as db:
+                        deleted = await UserTokenRepo.delete_expired_batch(db, now, batch_size)
+                    total += deleted
+                    if deleted < batch_size:
+                        break
+                    await asyncio.sleep(pause_sec)
+            finally:
+                await lock_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": REAPER_LOCK_NAME})
+                await lock_conn.commit()
+
+        if total:
+            logger.info("Token reaper deleted %s expired tokens", total)
+        return total
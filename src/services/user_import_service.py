@@ -0,0 +1,242 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from typing import AsyncIterable, AsyncIterator, Callable, List, Optional, Tuple
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import uuid
+
+from common.setting import get_settings
+from repo import UserRepo
+from schemas import UserImportRow, UserImportError, UserImportResult
+from utils.datetime_utils import get_current_datetime
+from utils.hash_utils import hash_password
+
+logger = logging.getLogger(__name__)
+setting = get_settings()
+
+ARGON2_PREFIXES = ("$argon2id$", "$argon2i$", "$argon2d$")
+# 1 bản ghi CSV (có thể nhiều dòng trong field có quote) không được dài hơn
+MAX_CSV_RECORD_CHARS = 64 * 1024
+
+
+def new_import_executor(workers: int = 0) -> ProcessPoolExecutor:
+    # spawn: fork từ process đang chạy event loop / thread / connection pool không an toàn
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+@lru_cache
+def get_import_executor() -> ProcessPoolExecutor:
+    """
+    Cached process pool shared by the import requests of this worker, created on first use
+    """
+    # Pool riêng cho import để không chiếm worker hash của login; chia CPU cho các
+    # worker process như hash pool, tránh N worker x N process import
+    workers = setting.IMPORT_HASH_WORKERS or max(1, (os.cpu_count() or 1) // max(1, setting.WORKERS))
+    return new_import_executor(workers)
+
+
+def shutdown_import_executor():
+    if get_import_executor.cache_info().currsize:
+        get_import_executor().shutdown(wait=False, cancel_futures=True)
+        get_import_executor.cache_clear()
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Split a byte stream (e.g. request.stream()) into text lines incrementally
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_csv_records(lines: AsyncIterable[str]) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Join physical lines into CSV records: a quoted field may contain newlines.
+    Yields (first line_no, record text).
+    """
+    record: List[str] = []
+    record_chars = quotes = 0
+    start = line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not record:
+            start = line_no
+        record.append(line)
+        record_chars += len(line) + 1
+        quotes += line.count('"')
+        # Số dấu " lẻ -> còn field đang mở quote ("" escape luôn đi theo cặp)
+        if quotes % 2 and record_chars <= MAX_CSV_RECORD_CHARS:
+            continue
+        yield start, "\n".join(record)
+        record, record_chars, quotes = [], 0, 0
+    if record:
+        # Hết input mà quote vẫn mở: csv.reader sẽ báo lỗi cho bản ghi này
+        yield start, "\n".join(record)
+
+
+class UserImportService:
+    @staticmethod
+    async def _parse(lines: AsyncIterable[str], fmt: str) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+        """
+        Yields (line_no, fields, error) for every non-empty record
+        """
+        if fmt == "csv":
+            records = iter_csv_records(lines)
+        else:
+            records = UserImportService._numbered(lines)
+
+        header = None
+        async for line_no, line in records:
+            if not line.strip():
+                continue
+            try:
+                if fmt == "csv":
+                    if len(line) > MAX_CSV_RECORD_CHARS:
+                        raise ValueError("record too long (unterminated quoted field?)")
+                    values = next(csv.reader([line], strict=True))
+                    if header is None:
+                        header = [h.strip() for h in values]
+                        continue
+                    yield line_no, dict(zip(header, values)), None
+                else:
+                    fields = json.loads(line)
+                    if not isinstance(fields, dict):
+                        raise ValueError("expected a JSON object")
+                    yield line_no, fields, None
+            except (ValueError, csv.Error) as e:
+                yield line_no, None, f"cannot parse line: {e}"
+
+    @staticmethod
+    async def _numbered(lines: AsyncIterable[str]) -> AsyncIterator[Tuple[int, str]]:
+        line_no = 0
+        async for line in lines:
+            line_no += 1
+            yield line_no, line
+
+    @staticmethod
+    def _report(result: UserImportResult, line: int, email: Optional[str], error: str):
+        result.failed += 1
+        if len(result.errors) < setting.IMPORT_MAX_ERRORS:
+            result.errors.append(UserImportError(line=line, email=email, error=error))
+
+    @staticmethod
+    async def import_users(session_factory: Callable, lines: AsyncIterable[str], fmt: str,
+                           executor: Executor,
+                           batch_size: int = setting.IMPORT_BATCH_SIZE) -> UserImportResult:
+        """
+        Stream-import users from CSV (with header) or NDJSON lines.
+
+        Plain passwords are hashed on `executor` (a process pool for big imports);
+        rows with an Argon2 `password_hash` are stored as is. Every batch is
+        one multi-row INSERT in its own transaction, so memory stays bounded by
+        the batch size whatever the input size.
+        """
+        if fmt not in ("csv", "ndjson"):
+            raise ValueError(f"Unsupported import format: {fmt}")
+
+        result = UserImportResult()
+        batch: List[Tuple[int, UserImportRow]] = []
+        seen_emails = set()
+
+        async for line_no, fields, error in UserImportService._parse(lines, fmt):
+            result.total += 1
+            if error:
+                UserImportService._report(result, line_no, None, error)
+                continue
+
+            try:
+                row = UserImportRow.model_validate({k: v for k, v in fields.items() if v not in ("", None)})
+            except ValidationError as e:
+                UserImportService._report(result, line_no, fields.get("email"),
+                                          "; ".join(err["msg"] for err in e.errors()))
+                continue
+
+            if bool(row.password) == bool(row.password_hash):
+                UserImportService._report(result, line_no, row.email, "exactly one of password / password_hash is required")
+                continue
+            if row.password_hash and not row.password_hash.startswith(ARGON2_PREFIXES):
+                UserImportService._report(result, line_no, row.email, "password_hash is not an Argon2 hash")
+                continue
+            if row.email in seen_emails:
+                UserImportService._report(result, line_no, row.email, "duplicate email in import")
+                continue
+            seen_emails.add(row.email)
+
+            batch.append((line_no, row))
+            if len(batch) >= batch_size:
+                await UserImportService._flush(session_factory, batch, executor, result)
+                batch = []
+                # Batch trước đã commit, trùng email với nó sẽ bị bắt bởi IN query
+                seen_emails.clear()
+
+        if batch:
+            await UserImportService._flush(session_factory, batch, executor, result)
+
+        logger.info("Imported %s/%s users, %s failed", result.imported, result.total, result.failed)
+        return result
+
+    @staticmethod
+    async def _flush(session_factory: Callable, batch: List[Tuple[int, UserImportRow]],
+                     executor: Executor, result: UserImportResult):
+        async with session_factory() as db:
+            existing = await UserRepo.get_existing_emails(db, [row.email for _, row in batch])
+            pending = []
+            for line_no, row in batch:
+                if row.email in existing:
+                    UserImportService._report(result, line_no, row.email, "email already registered")
+                else:
+                    pending.append((line_no, row))
+
+            # Hash song song trên executor, event loop không bị block
+            loop = asyncio.get_running_loop()
+            hashed = iter(await asyncio.gather(*(
+                loop.run_in_executor(executor, hash_password, row.password)
+                for _, row in pending if row.password
+            )))
+            hashes = [next(hashed) if row.password else row.password_hash for _, row in pending]
+
+            now = get_current_datetime()
+            records = [{
+                "id": str(uuid.uuid4()),
+                "email": row.email,
+                "user_name": row.user_name,
+                "password": password_hash,
+                "status": row.status.value,
+                "created_at": now,
+                "updated_at": now,
+            } for (_, row), password_hash in zip(pending, hashes)]
+
+            try:
+                await UserRepo.bulk_create(db, records)
+                await db.commit()
+                result.imported += len(records)
+                return
+            except IntegrityError:
+                await db.rollback()
+
+        # Batch lỗi (thường do email bị tạo đồng thời) -> insert từng dòng để biết dòng nào lỗi
+        for (line_no, row), record in zip(pending, records):
+            async with session_factory() as db:
+                try:
+                    await UserRepo.bulk_create(db, [record])
+                    await db.commit()
+                    result.imported += 1
+                except IntegrityError as e:
+                    await db.rollback()
+                    UserImportService._report(result, line_no, row.email, f"DB constraint: {e.orig}")
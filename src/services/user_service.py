@@ -2,32 +2,40 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 import logging
 
-from schemas import UserCreate, UserRead, RegisterReponse, UserTokenBase, TokenType
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+import base64
+import json
+
+from common.setting import get_settings
+from schemas import (UserCreate, UserRead, RegisterReponse, UserTokenBase, TokenType,
+                     UserBatchItem, UserBatchResponse, UserListFilter, UserListResponse)
 from repo import UserRepo, UserTokenRepo
-from utils.hash_utils import hash_password
+from utils.hash_utils import hash_password_async
 from utils.utils import generate_confirm_token
 
 logger = logging.getLogger(__name__)
+setting = get_settings()
 
 class UserService:
     @staticmethod
     async def register_user(db: Session, user_in: UserCreate) -> RegisterReponse:
         # Check email tồn tại chưa
-        existing = await UserRepo.get_by_email(db, user_in.email)
+        existing = await UserRepo.get_cached_by_email(db, user_in.email)
         if existing:
-            logger.error(f'Email ({existing.email}) already registered')
+            logger.error('Email (%s) already registered', existing.email)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered",
             )
 
         # Hash password
-        user_in.password = hash_password(user_in.password)
-        logger.info('Hash password')
+        user_in.password = await hash_password_async(user_in.password)
+        logger.debug('Hash password')
         
         # Create new user
         new_user = await UserRepo.create(db, user_in)
-        logger.info('Create user')
+        logger.debug('Create user')
         
         # Create confirm token
         user_token = UserTokenBase(
@@ -50,21 +58,72 @@ class UserService:
             confirm_token=confirm_token.token,
         )
         
-        logger.info('Response user')
+        logger.debug('Response user')
         return user_rs
     
 
     @staticmethod
     async def get_user_by_id(db: Session, id: str) -> UserRead:
         # Check email tồn tại chưa
-        user = await UserRepo.get_by_id(db, id)
+        user = await UserRepo.get_cached_by_id(db, id)
         if not user:
-            logger.error(f'Email ({user.email}) already registered')
+            logger.error('User (%s) not exist', id)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User not exist",
             )
 
         # Response user
-        user_rs = UserRead.model_validate(user)
-        return user_rs
+        return user
+
+    @staticmethod
+    async def get_users_by_ids(db: Session, ids: List[str]) -> UserBatchResponse:
+        if len(ids) > setting.USER_BATCH_MAX_IDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {setting.USER_BATCH_MAX_IDS} ids per request",
+            )
+
+        users = await UserRepo.get_cached_many(db, list(dict.fromkeys(ids)))
+
+        # Giữ đúng thứ tự request, id không tồn tại thì found=False
+        return UserBatchResponse(items=[
+            UserBatchItem(id=i, found=i in users, user=users.get(i)) for i in ids
+        ])
+
+    @staticmethod
+    def _encode_cursor(user: UserRead) -> str:
+        raw = json.dumps([user.created_at.isoformat(), user.id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            created_at, user_id = json.loads(raw)
+            return datetime.fromisoformat(created_at), str(user_id)
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor",
+            )
+
+    @staticmethod
+    async def list_users(db: Session, filters: UserListFilter,
+                         cursor: Optional[str], limit: int) -> UserListResponse:
+        after = UserService._decode_cursor(cursor) if cursor else None
+        # Lấy dư 1 dòng để biết còn trang sau hay không
+        rows = await UserRepo.list_users(db, filters, after, limit + 1)
+        users = [UserRead.model_validate(row) for row in rows[:limit]]
+        next_cursor = UserService._encode_cursor(users[-1]) if len(rows) > limit else None
+        return UserListResponse(items=users, next_cursor=next_cursor)
+
+    @staticmethod
+    async def stream_users_ndjson(session_factory, filters: UserListFilter) -> AsyncIterator[bytes]:
+        """
+        NDJSON export of the whole (filtered) table with constant memory.
+        Uses its own session, which stays open while the response streams.
+        """
+        async with session_factory() as db:
+            async for row in UserRepo.stream_users(db, filters, setting.USER_STREAM_CHUNK):
+                yield UserRead.model_validate(row).model_dump_json().encode() + b"\n"
@@ -0,0 +1,78 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import threading
+import time
+
+from common.metrics import CACHE_EVICTIONS_TOTAL, CACHE_LOOKUPS_TOTAL
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache where every entry has its own expiry.
+
+    Expiry times are wall-clock epoch seconds so they can come straight
+    from a JWT `exp` claim. When full, the least recently used entry is evicted.
+    Hits, misses and evictions are also counted in Prometheus under `name`.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None, name: str = "default"):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Lấy sẵn child theo label, không tra label trên mỗi lần get
+        self._hit_counter = CACHE_LOOKUPS_TOTAL.labels(name, "hit")
+        self._miss_counter = CACHE_LOOKUPS_TOTAL.labels(name, "miss")
+        self._eviction_counter = CACHE_EVICTIONS_TOTAL.labels(name)
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                self._miss_counter.inc()
+                return None
+
+            expire_at, value = entry
+            if expire_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                self._miss_counter.inc()
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            self._hit_counter.inc()
+            return value
+
+    def set(self, key: Hashable, value: Any, expire_at: Optional[float] = None):
+        if expire_at is None:
+            expire_at = time.time() + (self.ttl or 0)
+        with self._lock:
+            self._data[key] = (expire_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+                self._eviction_counter.inc()
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -1,15 +1,30 @@
 # src/utils/hash_utils.py
 from argon2 import PasswordHasher, Type
 from argon2.exceptions import VerifyMismatchError
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException, status
+from functools import lru_cache
 from typing import Optional
+import asyncio
 import hmac
 import hashlib
+import logging
+import multiprocessing
+import os
+import threading
 
-# Configure Argon2 parameters as needed (adjust by your hardware)
+from common.metrics import CRYPTO_SECONDS, observe
+from common.setting import get_settings
+
+logger = logging.getLogger(__name__)
+setting = get_settings()
+
+# Argon2 parameters come from settings, calibrate them per hardware with
+# `python manage.py calibrate-argon2`. Existing hashes are upgraded on login.
 ph = PasswordHasher(
-    time_cost=3,
-    memory_cost=64 * 1024,  # 64 MiB
-    parallelism=2,
+    time_cost=setting.ARGON2_TIME_COST,
+    memory_cost=setting.ARGON2_MEMORY_COST,
+    parallelism=setting.ARGON2_PARALLELISM,
     hash_len=32,
     type=Type.ID
 )
@@ -29,4 +44,88 @@ def verify_password(password: str, hash_str: str, pepper: Optional[str] = None)
     try:
         return ph.verify(hash_str, pw)
     except VerifyMismatchError:
-        return False
\ No newline at end of file
+        return False
+
+def needs_rehash(hash_str: str) -> bool:
+    # True when hash_str was made with parameters other than the current ones
+    return ph.check_needs_rehash(hash_str)
+
+
+class HashWorkerPool:
+    """
+    Bounded worker pool running Argon2 outside the event loop.
+
+    At most `size + queue_size` jobs are accepted at once; anything above that
+    is rejected immediately with 503 instead of queueing behind the others.
+    """
+
+    def __init__(self, kind: str, size: int, queue_size: int, timeout: float):
+        # Mặc định chia đều CPU cho các worker process, tránh N worker x N thread Argon2
+        self.size = size or max(1, (os.cpu_count() or 1) // max(1, setting.WORKERS))
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.size + queue_size)
+        if kind == "process":
+            # spawn: pool tạo lazy trong worker đã có event loop, thread log, connection pool
+            self._executor: Executor = ProcessPoolExecutor(
+                max_workers=self.size, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            # argon2-cffi releases the GIL, so threads also use every core
+            self._executor = ThreadPoolExecutor(max_workers=self.size,
+                                                thread_name_prefix="argon2")
+        logger.info("Init %s hash pool with %s workers", kind, self.size)
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry later",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Release the slot only when the job really finishes (or is cancelled
+        # while still queued), so abandoned jobs keep counting against the bound
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Password hashing timed out after %ss", self.timeout)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry later",
+                headers={"Retry-After": "1"},
+            )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache
+def get_hash_pool() -> HashWorkerPool:
+    """
+    Cached singleton for the hash worker pool, created on first use
+    """
+    return HashWorkerPool(
+        kind=setting.HASH_POOL_KIND,
+        size=setting.HASH_POOL_SIZE,
+        queue_size=setting.HASH_QUEUE_SIZE,
+        timeout=setting.HASH_TIMEOUT_SEC,
+    )
+
+def shutdown_hash_pool():
+    if get_hash_pool.cache_info().currsize:
+        get_hash_pool().shutdown()
+        get_hash_pool.cache_clear()
+
+async def hash_password_async(password: str, pepper: Optional[str] = None) -> str:
+    # Thời gian tính cả lúc chờ worker trong pool
+    with observe(CRYPTO_SECONDS, "argon2_hash", server_timing="hash"):
+        return await get_hash_pool().run(hash_password, password, pepper)
+
+async def verify_password_async(password: str, hash_str: str, pepper: Optional[str] = None) -> bool:
+    with observe(CRYPTO_SECONDS, "argon2_verify", server_timing="hash"):
+        return await get_hash_pool().run(verify_password, password, hash_str, pepper)
@@ -0,0 +1,156 @@
+"""
+Asymmetric JWT signing keys with scheduled rotation.
+
+Keys are PEM files in a directory shared by all workers, one file per
+rotation slot (`slot = now // rotation_sec`). Whoever needs a slot's key first
+creates the file atomically, so workers and hosts agree on the keys without
+coordinating. The next slot's key is created ahead of time, so it is in the
+JWKS before any token is signed with it. Old keys stay published for the
+overlap window, until every token signed with them has expired.
+"""
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from functools import lru_cache
+from jwt.algorithms import get_default_algorithms
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from common.setting import get_settings
+
+logger = logging.getLogger(__name__)
+setting = get_settings()
+
+ASYMMETRIC_ALGORITHMS = ("EdDSA", "RS256")
+
+
+def is_asymmetric(algorithm: str) -> bool:
+    return algorithm in ASYMMETRIC_ALGORITHMS
+
+
+def _generate_private_key(algorithm: str):
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class JwtKeyStore:
+    def __init__(self, keys_dir: str, algorithm: str, rotation_sec: int, overlap_sec: int):
+        self.algorithm = algorithm
+        self.rotation_sec = rotation_sec
+        self.overlap_slots = -(-overlap_sec // rotation_sec)  # ceil
+        self.keys_dir = Path(keys_dir) / algorithm.lower()
+        self.keys_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._slot: Optional[int] = None
+        self._private_keys: Dict[str, object] = {}
+        self._public_keys: Dict[str, object] = {}
+        self._jwks: bytes = b'{"keys":[]}'
+        self._jwks_etag: str = ""
+        self.refresh()
+
+    def _kid(self, slot: int) -> str:
+        return f"{self.algorithm.lower()}-{slot}"
+
+    def _current_slot(self) -> int:
+        return int(time.time() // self.rotation_sec)
+
+    def _ensure_key_file(self, slot: int) -> Path:
+        path = self.keys_dir / f"{slot}.pem"
+        if path.exists():
+            return path
+
+        pem = _generate_private_key(self.algorithm).private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        # Ghi file tạm rồi link: worker khác không bao giờ đọc file ghi dở,
+        # và nếu có worker tạo trước thì link thất bại -> dùng key của họ
+        tmp_path = self.keys_dir / f".{slot}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(pem)
+        try:
+            os.link(tmp_path, path)
+            logger.info("Created JWT signing key %s", self._kid(slot))
+        except FileExistsError:
+            pass
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return path
+
+    def refresh(self):
+        """
+        Make sure the current and next keys exist, load every key still
+        inside the overlap window and drop older ones.
+        """
+        with self._lock:
+            slot = self._current_slot()
+            self._ensure_key_file(slot)
+            self._ensure_key_file(slot + 1)
+
+            oldest = slot - self.overlap_slots
+            private_keys, public_keys, jwks = {}, {}, []
+            algo = get_default_algorithms()[self.algorithm]
+            for path in sorted(self.keys_dir.glob("*.pem")):
+                key_slot = int(path.stem)
+                if key_slot < oldest:
+                    path.unlink(missing_ok=True)
+                    continue
+
+                kid = self._kid(key_slot)
+                private_key = self._private_keys.get(kid)
+                if private_key is None:
+                    private_key = serialization.load_pem_private_key(path.read_bytes(), password=None)
+                private_keys[kid] = private_key
+                public_keys[kid] = private_key.public_key()
+
+                jwk = json.loads(algo.to_jwk(public_keys[kid]))
+                jwk.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+                jwks.append(jwk)
+
+            self._private_keys, self._public_keys = private_keys, public_keys
+            self._jwks = json.dumps({"keys": jwks}, separators=(",", ":")).encode()
+            self._jwks_etag = hashlib.sha256(self._jwks).hexdigest()[:32]
+            self._slot = slot
+
+    def signing_key(self) -> Tuple[str, object]:
+        # Chỉ đọc dict đã load, không refresh (đọc file / tạo key RSA) trên event loop:
+        # key của slot kế tiếp đã được load trước 1 slot, refresh nền lo phần còn lại
+        keys = self._private_keys
+        kid = self._kid(self._current_slot())
+        key = keys.get(kid)
+        if key is None:
+            # Refresh nền trễ cả 1 slot: ký bằng key đã load gần nhất (vẫn còn trong JWKS)
+            kid = self._kid(self._slot)
+            key = keys[kid]
+        return kid, key
+
+    def public_key(self, kid: Optional[str]):
+        return self._public_keys.get(kid)
+
+    def jwks(self) -> Tuple[bytes, str]:
+        """
+        Returns the serialized JWKS document and its ETag
+        """
+        return self._jwks, self._jwks_etag
+
+
+@lru_cache
+def get_key_store() -> JwtKeyStore:
+    """
+    Cached singleton for the JWT key store
+    """
+    return JwtKeyStore(
+        keys_dir=setting.JWT_KEYS_DIR,
+        algorithm=setting.JWT_ALGORITHM,
+        rotation_sec=setting.JWT_KEY_ROTATION_SEC,
+        overlap_sec=setting.JWT_KEY_OVERLAP_SEC,
+    )
@@ -1,11 +1,29 @@
 import jwt  
 import datetime
+import uuid
+from functools import lru_cache
+from common.metrics import CRYPTO_SECONDS, observe
 from common.setting import get_settings
+from utils.cache_utils import TTLCache
 from utils.datetime_utils import get_current_datetime
+from utils.jwt_keys import get_key_store, is_asymmetric
 
 setting = get_settings()
 
-def create_jwt_token(user: dict, secret_key=setting.JWT_SECRET):
+def _encode(payload: dict, secret_key: str) -> str:
+    with observe(CRYPTO_SECONDS, "jwt_encode", server_timing="jwt"):
+        if is_asymmetric(setting.JWT_ALGORITHM):
+            kid, private_key = get_key_store().signing_key()
+            return jwt.encode(payload, private_key, algorithm=setting.JWT_ALGORITHM, headers={"kid": kid})
+        return jwt.encode(payload, secret_key, algorithm=setting.JWT_ALGORITHM)
+
+def _verification_key(token: str, secret_key: str):
+    if is_asymmetric(setting.JWT_ALGORITHM):
+        kid = jwt.get_unverified_header(token).get("kid")
+        return get_key_store().public_key(kid)
+    return secret_key
+
+def create_jwt_token(user: dict, secret_key=setting.JWT_SECRET, family: str = None):
     expires_dt = get_current_datetime() + datetime.timedelta(seconds=setting.ACCESS_TOKEN_EXPIRES_SECONDS)
     expires_st = int(expires_dt.timestamp())
     
@@ -14,6 +32,7 @@ def create_jwt_token(user: dict, secret_key=setting.JWT_SECRET):
         "email": user["email"],
         "name": user["name"],
         "role": user["role"],
+        "jti": uuid.uuid4().hex,
         "exp": expires_st,
         "expires_iso": expires_dt.isoformat() + "Z",
     }
@@ -22,12 +41,15 @@ def create_jwt_token(user: dict, secret_key=setting.JWT_SECRET):
     refresh_expires =  get_current_datetime() + datetime.timedelta(days=setting.REFRESH_TOKEN_EXPIRES_DAY)
     refresh_payload = {
         "user_id": str(user["user_id"]),
+        "jti": uuid.uuid4().hex,
+        # Refresh token được rotate trong cùng 1 family -> revoke cả family khi reuse
+        "fam": family or uuid.uuid4().hex,
         "exp": int(refresh_expires.timestamp()),
         "type": "refresh"
     }
     
-    access_token = jwt.encode(access_payload, secret_key, algorithm="HS256")
-    refresh_token = jwt.encode(refresh_payload, secret_key, algorithm="HS256")
+    access_token = _encode(access_payload, secret_key)
+    refresh_token = _encode(refresh_payload, secret_key)
     
     return access_token, expires_st, refresh_token
 
@@ -40,14 +62,47 @@ def verify_jwt_token(token: str, secret_key=setting.JWT_SECRET):
         None: If token is invalid or expired
     """
     try:
+        key = _verification_key(token, secret_key)
+        if key is None:
+            return None  # kid không tồn tại hoặc đã hết hạn
+
         # PyJWT sẽ tự động check exp field nếu có trong payload
-        payload = jwt.decode(
-            token, 
-            secret_key, 
-            algorithms=["HS256"],
-            options={"verify_exp": True}  # Verify expiration
-        )
+        # Chỉ chấp nhận đúng thuật toán đã cấu hình (chống alg confusion)
+        with observe(CRYPTO_SECONDS, "jwt_decode", server_timing="jwt"):
+            payload = jwt.decode(
+                token, 
+                key, 
+                algorithms=[setting.JWT_ALGORITHM],
+                options={"verify_exp": True}  # Verify expiration
+            )
         return payload
         
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
         return None
+
+
+@lru_cache
+def get_token_cache() -> TTLCache:
+    """
+    Cached singleton for the verified-token cache
+    """
+    return TTLCache(maxsize=setting.TOKEN_CACHE_SIZE, name="token")
+
+def verify_jwt_token_cached(token: str):
+    """
+    Same as verify_jwt_token, but remembers verified tokens until their `exp`
+    so repeated calls skip the HMAC check and JSON decoding.
+    Invalid tokens are never cached.
+    """
+    cache = get_token_cache()
+    signature = token.rsplit(".", 1)[-1]
+
+    cached = cache.get(signature)
+    # So sánh cả token để không trả payload của token khác cùng signature
+    if cached is not None and cached[0] == token:
+        return cached[1]
+
+    payload = verify_jwt_token(token)
+    if payload and "exp" in payload:
+        cache.set(signature, (token, payload), expire_at=payload["exp"])
+    return payload
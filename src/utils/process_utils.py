@@ -0,0 +1,42 @@
+import logging
+import os
+import resource
+import signal
+import sys
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_mb() -> float:
+    """
+    Resident memory of this process (MiB)
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        # Không có /proc (macOS): dùng peak RSS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class MemoryWatchdog:
+    """
+    Ask this worker to shut down gracefully (SIGTERM, as uvicorn's supervisor
+    does) once its RSS exceeds `limit_mb`; the supervisor starts a fresh one.
+    Only meaningful when running under the multi-worker supervisor.
+    """
+    def __init__(self, limit_mb: int):
+        self.limit_mb = limit_mb
+        self._triggered = False
+
+    async def check(self):
+        if self._triggered:
+            return
+        rss = current_rss_mb()
+        if rss > self.limit_mb:
+            self._triggered = True
+            logger.warning("Worker %s RSS %.0f MiB > %s MiB, recycling", os.getpid(), rss, self.limit_mb)
+            os.kill(os.getpid(), signal.SIGTERM)
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Coroutine, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Keep strong references, otherwise the event loop may garbage-collect
+# fire-and-forget tasks before they finish
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _on_task_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.error("Background task %s failed: %r", task.get_name(), exc)
+
+
+def run_in_background(coro: Coroutine, name: Optional[str] = None) -> asyncio.Task:
+    """
+    Schedule a coroutine that must not delay the current request
+    """
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_task_done)
+    return task
+
+
+async def wait_background_tasks(timeout: float = 5.0):
+    """
+    Give pending background tasks a chance to finish on shutdown
+    """
+    if not _background_tasks:
+        return
+    done, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+    for task in pending:
+        task.cancel()
+
+
+async def run_periodically(fn: Callable[[], Awaitable], interval_sec: float, name: str,
+                           run_immediately: bool = False):
+    """
+    Call `fn` every `interval_sec` until cancelled; errors are logged, not raised
+    """
+    while True:
+        if not run_immediately:
+            await asyncio.sleep(interval_sec)
+        run_immediately = False
+        try:
+            await fn()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Periodic task %s failed: %r", name, e)
+
+
+async def cancel_tasks(tasks: List[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+# Code trong src import theo tên module (common.*, db.*), giống main.py / manage.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+for name, value in {"DB_HOST": "localhost", "DB_PORT": "3306", "DB_USER": "test",
+                    "DB_PW": "test", "DB_NAME": "test"}.items():
+    os.environ.setdefault(name, value)
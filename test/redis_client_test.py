@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from db.redis_client import AsyncRedisClient, RedisPoolExhaustedError, RedisUnavailableError
+
+
+async def _instant_connect(connection):
+    pass
+
+
+def test_refused_connect_counts_as_breaker_failure():
+    async def scenario():
+        redis_client = AsyncRedisClient()
+        # Không có gì nghe ở port 1: connect retry tới hết timeout của pool,
+        # lỗi giống hệt lúc pool đầy ("No connection available.")
+        redis_client.host, redis_client.port = "127.0.0.1", 1
+
+        for _ in range(redis_client.breaker.failure_threshold):
+            with pytest.raises(RedisUnavailableError) as exc_info:
+                await redis_client.run(lambda c: c.ping())
+            assert not isinstance(exc_info.value, RedisPoolExhaustedError)
+
+        assert redis_client.breaker.state == "open"
+        with pytest.raises(RedisUnavailableError, match="circuit is open"):
+            await redis_client.run(lambda c: c.ping())
+
+    asyncio.run(scenario())
+
+
+def test_full_pool_timeout_does_not_count_as_breaker_failure():
+    async def scenario():
+        redis_client = AsyncRedisClient()
+        client = await redis_client.get_client()
+        pool = client.connection_pool
+        pool.ensure_connection = _instant_connect
+
+        # Giữ hết connection của pool, như khi mọi slot đang bận với request khác
+        held = [await pool.get_connection("PING") for _ in range(pool.max_connections)]
+        try:
+            with pytest.raises(RedisPoolExhaustedError):
+                await redis_client.run(lambda c: c.ping())
+        finally:
+            for connection in held:
+                await pool.release(connection)
+
+        assert redis_client.breaker.failures == 0
+        assert redis_client.breaker.state == "closed"
+
+    asyncio.run(scenario())